@@ -14,9 +14,9 @@ to be `mean(training_loss) + 2 * standard_deviation(training_loss)`.
 print(__doc__)
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import logging
-import pickle
 from typing import Tuple, Union
 import warnings
 
@@ -29,6 +29,8 @@ import matplotlib.transforms as transforms
 import seaborn as sns
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel as DDP
 from sklearn import metrics
 
 from options.train_arguments import TrainArguments
@@ -140,43 +142,32 @@ def temporalize(
     --------
         Tuple[np.ndarray, np.ndarray, np.ndarray]: Tuple of numpy arrays containing formatted signals, labels and the broadcasted ELM IDs.
     """
-    X = []
-    y = []
-    count = 1
-    broadcasted_elm_ids = []
-    for i_current in range(len(allowed_indices)):
-        # iterate the time series with two pointers offset by one time step
-        # to compare them.
-        if i_current == 0:
-            i_prev = 0
-        else:
-            i_prev = i_current - 1
-        prev_time_idx = allowed_indices[i_prev]
-        current_time_idx = allowed_indices[i_current]
-        diff = current_time_idx - prev_time_idx
-        broadcasted_elm_ids.append(count)
-
-        # if difference is greater than 1, a new ELM event is started in the time
-        # series - increment the counter.
-        if diff not in [0, 1]:
-            count += 1
-
-        # capture the signal and labels upto the signal window size
-        signal_window = signals[
-            current_time_idx : current_time_idx + args.signal_window_size
-        ]
-        label = labels[
-            current_time_idx
-            + args.signal_window_size
-            + args.label_look_ahead
-            - 1
-        ]
-        X.append(signal_window)
-        y.append(label)
-    broadcasted_elm_ids = np.array(broadcasted_elm_ids)
-    X = np.array(X).reshape(-1, args.signal_window_size, 64)
-    X = X.astype(np.float32)
-    y = np.array(y).astype(np.uint8)
+    # every allowed index is the first time step of a rolling window; the
+    # differences between consecutive allowed indices mark the start of a new
+    # ELM event in the time series (difference other than 0 or 1). The ID of
+    # an event is incremented only after the first window of the new event.
+    diff = np.diff(allowed_indices, prepend=allowed_indices[:1])
+    new_event = (diff != 0) & (diff != 1)
+    broadcasted_elm_ids = np.ones(len(allowed_indices), dtype=np.int64)
+    broadcasted_elm_ids[1:] += np.cumsum(new_event[:-1])
+
+    # capture the signal windows and labels upto the signal window size with
+    # a strided view of all the windows, shape: (n_windows, 64, sws). Signals
+    # are cast to float32 first so that the gather below is the only copy.
+    signals = np.asarray(signals, dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        signals, window_shape=args.signal_window_size, axis=0
+    ).transpose(0, 2, 1)
+    # gather straight into a preallocated C-contiguous output; allowed indices
+    # are in range by construction, and `clip` mode avoids a buffered copy
+    X = np.empty(
+        (len(allowed_indices), args.signal_window_size, signals.shape[-1]),
+        dtype=np.float32,
+    )
+    np.take(windows, allowed_indices, axis=0, out=X, mode="clip")
+    y = labels[
+        allowed_indices + args.signal_window_size + args.label_look_ahead - 1
+    ].astype(np.uint8)
     print(f"X shape: {X.shape}")
     print(f"y shape: {y.shape}")
     print(f"Repeats shape: {broadcasted_elm_ids.shape}")
@@ -186,8 +177,12 @@ def temporalize(
 def make_tensors(
     X: Union[np.ndarray, torch.Tensor], y: Union[np.ndarray, torch.Tensor]
 ) -> Tuple[torch.Tensor, torch.Tensor]:
-    """Create PyTorch tensors from NumPy arrays."""
-    X = torch.as_tensor(X, dtype=torch.float32)
+    """Create PyTorch tensors from NumPy arrays. Contiguous float32 signals
+    share their memory with the NumPy array instead of being copied."""
+    if isinstance(X, np.ndarray):
+        X = torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32))
+    else:
+        X = X.to(torch.float32)
     y = torch.as_tensor(y, dtype=torch.long)
 
     return X, y
@@ -238,8 +233,9 @@ class FCAutoencoder(nn.Module):
         self.fc4 = nn.Linear(
             in_features=num_nodes[0], out_features=input_features
         )
-        self.relu = nn.ReLU()
-        self.dropout = nn.Dropout(p=dropout)
+        # activations overwrite the linear layer outputs in place
+        self.relu = nn.ReLU(inplace=True)
+        self.dropout = nn.Dropout(p=dropout, inplace=True)
 
     def forward(self, x):
         x = torch.flatten(x, 1)
@@ -298,10 +294,8 @@ class Encoder(nn.Module):
     def forward(self, x):
         _, (hidden, _) = self.rnn(x)
         # hidden shape: (num_layers, batch_size, hidden_size)
-        hidden = (
-            hidden.transpose(0, 1)
-            .contiguous()
-            .view(-1, self.n_layers * self.hidden_dim)
+        hidden = hidden.permute(1, 0, 2).reshape(
+            -1, self.n_layers * self.hidden_dim
         )  # hidden shape: (batch_size, num_layers*hidden_size)
         return hidden
 
@@ -355,8 +349,11 @@ class Decoder(nn.Module):
 
     def forward(self, x):
         # x: (batch_size, num_layers*hidden_size)
-        x = x.repeat(1, self.seq_len, 1)
-        x = x.reshape(-1, self.seq_len, self.n_layers * self.hidden_dim)
+        # each sample's own latent vector at every time step; `expand` is a
+        # zero-stride view, so the output of a sample does not depend on the
+        # other samples in the batch
+        x = x.unsqueeze(1).expand(-1, self.seq_len, -1)
+        # x: (batch_size, seq_len, num_layers*hidden_size)
         x, _ = self.rnn(x)  # x: (batch_size, seq_len, hidden_dim)
         x = self.fc(x)  # x: (batch_size, seq_len, n_features)
 
@@ -394,18 +391,12 @@ class LSTMAutoencoder(nn.Module):
         return y.squeeze(0)
 
 
-def train_model(
-    args: argparse.Namespace,
-    train_dataloader: torch.utils.data.DataLoader,
-    valid_dataloader: torch.utils.data.DataLoader,
-) -> Tuple[object, dict]:
-    """Train the time series anomaly detector autoencoder model.
+def build_model(args: argparse.Namespace) -> nn.Module:
+    """Instantiate the autoencoder chosen by `--model_name`.
 
     Args:
     -----
         args (argparse.Namespace): Argparse namespace object.
-        train_dataloader (torch.utils.data.DataLoader): PyTorch training dataloader.
-        valid_dataloader (torch.utils.data.DataLoader): PyTorch validation dataloader.
 
     Raises:
     -------
@@ -413,10 +404,8 @@ def train_model(
 
     Returns:
     --------
-        Tuple: Tuple containing model instance and dictionary containing training and validation loss.
+        nn.Module: Autoencoder model instance.
     """
-    model = None
-    # choose the model and instantiate it
     if args.model_name == "lstm_ae":
         seq_len = args.signal_window_size
         n_features = 64
@@ -441,53 +430,114 @@ def train_model(
         model = FCAutoencoder(args, input_features=1024)
     else:
         raise NameError("Model name is not understood.")
+    return model
+
+
+def train_model(
+    args: argparse.Namespace,
+    model: nn.Module,
+    train_dataloader: torch.utils.data.DataLoader,
+    valid_dataloader: torch.utils.data.DataLoader,
+    _rank: Union[int, None] = None,
+) -> Tuple[object, dict]:
+    """Train the time series anomaly detector autoencoder model.
+
+    Args:
+    -----
+        args (argparse.Namespace): Argparse namespace object.
+        model (nn.Module): Autoencoder model instance from `build_model`.
+        train_dataloader (torch.utils.data.DataLoader): PyTorch training dataloader.
+        valid_dataloader (torch.utils.data.DataLoader): PyTorch validation dataloader.
+        _rank (int, optional): Process rank for distributed data parallel training. Defaults to None.
+
+    Returns:
+    --------
+        Tuple: Tuple containing model instance and dictionary containing training and validation loss.
+    """
     model = model.to(args.device)
 
-    # define optimizer, loss function and learning rate scheduler
+    # distributed and/or compiled model for the training and validation passes;
+    # `model` stays unwrapped so that the returned state dict keeps the original
+    # parameter names
+    run_model = model
+    if _rank is not None:
+        run_model = DDP(model, device_ids=[_rank])
+    if args.compile_model:
+        if hasattr(torch, "compile"):
+            print("Compiling model with `torch.compile`")
+            run_model = torch.compile(run_model, mode="reduce-overhead")
+        else:
+            print("`torch.compile` requires PyTorch >= 2.0; training in eager mode")
+
+    # define optimizer and learning rate scheduler; the L1 reconstruction loss
+    # is computed with `F.l1_loss` directly
     optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
     scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
         optimizer, mode="min", factor=0.5, patience=4, verbose=True
     )
-    criterion = nn.L1Loss(reduction="mean")
     history = dict(train=[], valid=[])
 
+    # fixed sequence length lets cuDNN pick the fastest LSTM kernels; mixed
+    # precision (fp16 autocast with gradient scaling) only applies to cuda
+    use_cuda = str(args.device).startswith("cuda")
+    if use_cuda:
+        torch.backends.cudnn.benchmark = True
+    mixed_precision = args.mixed_precision and use_cuda
+    scaler = torch.cuda.amp.GradScaler(enabled=mixed_precision)
+
     # start training and evaluation
     for epoch in range(args.n_epochs):
-        model = model.train()
+        run_model.train()
         ts = time.time()
-        train_losses = []
+        # accumulate the batch losses on device; read back once per epoch
+        train_loss_sum = torch.zeros((), device=args.device)
+        n_train_batches = 0
 
         for data in train_dataloader:
             seq_in = data[0]
-            seq_in = seq_in.to(args.device)
+            seq_in = seq_in.to(args.device, non_blocking=True)
 
             optimizer.zero_grad()
 
-            seq_out = model(seq_in)
+            with torch.autocast(device_type="cuda", enabled=mixed_precision):
+                seq_out = run_model(seq_in)
 
-            loss = criterion(seq_out, seq_in)
+                loss = F.l1_loss(seq_out, seq_in, reduction="mean")
 
-            loss.backward()
-            optimizer.step()
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
 
-            train_losses.append(loss.item())
+            train_loss_sum += loss.detach()
+            n_train_batches += 1
 
         # evaluate
-        valid_losses = []
-        model.eval()
+        valid_loss_sum = torch.zeros((), device=args.device)
+        n_valid_batches = 0
+        run_model.eval()
         with torch.no_grad():
             for data in valid_dataloader:
                 seq_in = data[0]
-                seq_in = seq_in.to(args.device)
+                seq_in = seq_in.to(args.device, non_blocking=True)
 
-                seq_out = model(seq_in)
+                with torch.autocast(device_type="cuda", enabled=mixed_precision):
+                    seq_out = run_model(seq_in)
 
-                loss = criterion(seq_out, seq_in)
+                    loss = F.l1_loss(seq_out, seq_in, reduction="mean")
 
-                valid_losses.append(loss.item())
+                valid_loss_sum += loss
+                n_valid_batches += 1
         te = time.time()
-        train_epoch_loss = np.mean(train_losses)
-        valid_epoch_loss = np.mean(valid_losses)
+        if _rank is not None:
+            # average the losses over all processes so that every rank steps
+            # the learning rate scheduler with the same validation loss
+            world_size = torch.distributed.get_world_size()
+            torch.distributed.all_reduce(train_loss_sum)
+            torch.distributed.all_reduce(valid_loss_sum)
+            n_train_batches *= world_size
+            n_valid_batches *= world_size
+        train_epoch_loss = (train_loss_sum / n_train_batches).item()
+        valid_epoch_loss = (valid_loss_sum / n_valid_batches).item()
         scheduler.step(valid_epoch_loss)
 
         history["train"].append(train_epoch_loss)
@@ -501,6 +551,43 @@ def train_model(
     return model, history
 
 
+def reconstruction_errors(
+    model: nn.Module,
+    data_loader: torch.utils.data.DataLoader,
+    n_samples: int,
+    device: Union[str, torch.device],
+) -> np.ndarray:
+    """Mean absolute reconstruction error of every input sequence.
+
+    Args:
+    -----
+        model (nn.Module): Trained autoencoder model instance.
+        data_loader (torch.utils.data.DataLoader): Dataloader yielding batches of
+            input sequences in order, without dropping the last batch.
+        n_samples (int): Total number of sequences in `data_loader`.
+        device (str or torch.device): Device to run the model on.
+
+    Returns:
+    --------
+        np.ndarray: Mean absolute error for each sequence.
+    """
+    model.eval()
+    mae = np.empty(n_samples, dtype=np.float32)
+    i_start = 0
+    with torch.no_grad():
+        for data in data_loader:
+            seq = data[0]
+            seq = seq.to(device, non_blocking=True)
+            # restore the batch dim. that `LSTMAutoencoder` squeezes for batch_size = 1
+            pred_seq = model(seq).view_as(seq)
+            # mean absolute error for each sequence in the batch
+            loss = F.l1_loss(pred_seq, seq, reduction="none").mean(dim=(1, 2))
+            mae[i_start : i_start + len(loss)] = loss.cpu().numpy()
+            i_start += len(loss)
+    assert i_start == n_samples
+    return mae
+
+
 def plot_loss(
     args: argparse.Namespace,
     history: dict,
@@ -610,7 +697,9 @@ def plot_recons_loss_dist(
         :, "reconstruction_error"
     ]
     ax = fig.add_subplot(121)
-    sns.distplot(no_elms, bins=50, kde=True, label="no ELMS", ax=ax)
+    sns.histplot(
+        no_elms, bins=50, kde=True, stat="density", label="no ELMS", ax=ax
+    )
     ax.axvline(
         threshold_val,
         zorder=10,
@@ -639,7 +728,9 @@ def plot_recons_loss_dist(
         :, "reconstruction_error"
     ]
     ax = fig.add_subplot(122)
-    sns.distplot(elms, bins=50, kde=True, label="ELMS", ax=ax)
+    sns.histplot(
+        elms, bins=50, kde=True, stat="density", label="ELMS", ax=ax
+    )
     ax.axvline(
         threshold_val,
         zorder=10,
@@ -702,21 +793,26 @@ def plot_recons_loss_with_signals(
         base_path (str): Path where the plots are saved-`outputs/ts_anomaly_detection_plots`
         show_plots (bool, optional): If true, display plots to the screen. Defaults to True.
     """
+    # scatter colors for every row, sliced per ELM event below
+    colors_all = np.where(
+        error_df["ground_truth"].to_numpy() == 1, palette[1], palette[0]
+    )
+
     # plot reconstruction loss with signals
     if plot_thresh:
         fig = plt.figure(figsize=(14, 12), dpi=120)
         classes = ["no ELM", "ELM", "Threshold"]
         class_colors = [palette[0], palette[1], "crimson"]
-        for i, id in enumerate(error_df["id"].unique().tolist()):
-            print(f"ID: {id}")
-            df = error_df[error_df["id"] == id]
+        for i, (id_val, df) in enumerate(error_df.groupby("id", sort=False)):
+            print(f"ID: {id_val}")
             ax = plt.subplot(4, 3, i + 1)
+            colors = colors_all[error_df.index.get_indexer(df.index)]
             df = df.reset_index(drop=True)
             indices = df.index.tolist()
             ax.scatter(
                 indices,
                 df.reconstruction_error,
-                c=df["ground_truth"].map({0: palette[0], 1: palette[1]}),
+                c=colors,
                 s=2,
                 marker="o",
             )
@@ -778,16 +874,16 @@ def plot_recons_loss_with_signals(
         fig = plt.figure(figsize=(14, 12), dpi=120)
         classes = ["no ELM", "ELM"]
         class_colors = [palette[0], palette[1]]
-        for i, id in enumerate(error_df["id"].unique().tolist()):
-            print(f"ID: {id}")
-            df = error_df[error_df["id"] == id]
+        for i, (id_val, df) in enumerate(error_df.groupby("id", sort=False)):
+            print(f"ID: {id_val}")
             ax = plt.subplot(4, 3, i + 1)
+            colors = colors_all[error_df.index.get_indexer(df.index)]
             df = df.reset_index(drop=True)
             indices = df.index.tolist()
             ax.scatter(
                 indices,
                 df.reconstruction_error_scaled,
-                c=df["ground_truth"].map({0: palette[0], 1: palette[1]}),
+                c=colors,
                 s=2,
                 marker="o",
             )
@@ -955,14 +1051,29 @@ def main(
     logger: logging.Logger,
     show_plots: bool = True,
     base_path="outputs/ts_anomaly_detection_plots",
+    _rank: Union[int, None] = None,  # process rank for data parallel dist. training
 ):
-    # get model checkpoint and test data path
-    test_data_path, model_ckpt_path = utils.create_output_paths(
-        args, infer_mode=False
-    )
+    # only the first process saves data, checkpoints and plots
+    is_main_process = _rank is None or _rank == 0
+    if _rank is not None:
+        # override args.device for multi-GPU distributed data parallel training
+        args.device = f"cuda:{_rank}"
+        torch.cuda.set_device(_rank)
+        print(f"Distributed data parallel: process rank {_rank} on GPU {args.device}")
+
+    # read the train and valid data in the background while the output paths
+    # and the model are set up
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        data_future = executor.submit(get_all_data, args, logger)
+
+        # get model checkpoint and test data path
+        test_data_path, model_ckpt_path = utils.create_output_paths(
+            args, infer_mode=False
+        )
+        model = build_model(args)
 
-    # get train and valid data
-    train_data, valid_data, _ = get_all_data(args, logger)
+        # get train and valid data
+        train_data, valid_data, _ = data_future.result()
 
     # reshape the train signals and print info
     (
@@ -997,72 +1108,77 @@ def main(
     )
     print_arrays_shape(X_valid, y_valid, mode="valid")
 
-    # autoencoders will only be trained on the negative classes
-    X_train_y0 = X_train[y_train == 0]
-    X_train_y1 = X_train[y_train == 1]
-    del X_train
-    y_train_y0_idx = np.where(y_train == 0)[0]
-    y_train_y1_idx = np.where(y_train == 1)[0]
-    y_train_y0 = y_train[y_train_y0_idx]
-    y_train_y1 = y_train[y_train_y1_idx]
-    del y_train
+    # autoencoders will only be trained on the negative classes; the positive
+    # class windows are only counted, not copied
+    train_mask_y0 = y_train == 0
+    X_train_y0 = X_train[train_mask_y0]
+    y_train_y0 = y_train[train_mask_y0]
+    n_train_y1 = np.count_nonzero(y_train == 1)
+    del X_train, y_train
 
     print_arrays_shape(X_train_y0, y_train_y0, mode="train_y0")
-    print_arrays_shape(X_train_y1, y_train_y1, mode="train_y1")
+    print(f"train_y1 samples: {n_train_y1}")
 
-    X_valid_y0 = X_valid[y_valid == 0]
-    X_valid_y1 = X_valid[y_valid == 1]
-    y_valid_y0_idx = np.where(y_valid == 0)[0]
-    y_valid_y1_idx = np.where(y_valid == 1)[0]
-    y_valid_y0 = y_valid[y_valid_y0_idx]
-    y_valid_y1 = y_valid[y_valid_y1_idx]
+    n_valid_y0 = np.count_nonzero(y_valid == 0)
+    n_valid_y1 = np.count_nonzero(y_valid == 1)
 
-    if not args.dry_run:
+    if not args.dry_run and is_main_process:
+        # raw `.npy` files can be loaded back lazily with
+        # `np.load(fname, mmap_mode="r")`
         fname = os.path.join(
             test_data_path,
-            f"validation_data_sws_{args.signal_window_size}_la_{args.label_look_ahead}{args.filename_suffix}.pkl",
+            f"validation_data_sws_{args.signal_window_size}_la_{args.label_look_ahead}{args.filename_suffix}",
         )
-        with open(fname, "wb") as f:
-            pickle.dump(
-                {
-                    "signals": X_valid,
-                    "labels": y_valid,
-                },
-                f,
-            )
+        np.save(f"{fname}_signals.npy", np.ascontiguousarray(X_valid))
+        np.save(f"{fname}_labels.npy", y_valid)
 
-    print_arrays_shape(X_valid_y0, y_valid_y0, mode="valid_y0")
-    print_arrays_shape(X_valid_y1, y_valid_y1, mode="valid_y1")
+    print(f"valid_y0 samples: {n_valid_y0}")
+    print(f"valid_y1 samples: {n_valid_y1}")
 
     train_dataset = create_tensor_dataset(X_train_y0, y_train_y0)
     # valid_dataset = create_tensor_dataset(X_valid_y0, y_valid_y0)
     validation_dataset = create_tensor_dataset(X_valid, y_valid)
 
-    train_loader = torch.utils.data.DataLoader(
-        train_dataset,
-        batch_size=args.batch_size,
-        num_workers=args.num_workers,
-        pin_memory=True,
-        drop_last=True,
-        shuffle=False,
-    )
-    valid_loader = torch.utils.data.DataLoader(
-        validation_dataset,
-        batch_size=args.batch_size,
-        num_workers=args.num_workers,
-        pin_memory=True,
-        drop_last=True,
-        shuffle=False,
-    )
-    validation_loader = torch.utils.data.DataLoader(
-        validation_dataset,
-        batch_size=1,
-        num_workers=args.num_workers,
-        pin_memory=True,
-        drop_last=False,
-        shuffle=False,
+    # keep the worker processes alive between epochs and let each of them
+    # prepare a few batches ahead
+    worker_kwargs = {}
+    if args.num_workers > 0:
+        worker_kwargs = dict(persistent_workers=True, prefetch_factor=4)
+
+    # the tensor datasets are indexed with a whole batch of indices from
+    # `BatchSampler`, so each batch is a single gather instead of a per-sample
+    # collate; only that one batch is then copied into pinned memory
+    # with distributed training, each process gets its own shard of the
+    # training and validation sets
+    def make_loader(dataset, drop_last, distributed=False):
+        if distributed:
+            sampler = torch.utils.data.distributed.DistributedSampler(
+                dataset, shuffle=False, drop_last=True
+            )
+        else:
+            sampler = torch.utils.data.SequentialSampler(dataset)
+        return torch.utils.data.DataLoader(
+            dataset,
+            batch_size=None,  # must be disabled when using samplers
+            sampler=torch.utils.data.BatchSampler(
+                sampler,
+                batch_size=args.batch_size,
+                drop_last=drop_last,
+            ),
+            num_workers=args.num_workers,
+            pin_memory=True,
+            **worker_kwargs,
+        )
+
+    distributed = _rank is not None
+    train_loader = make_loader(train_dataset, drop_last=True, distributed=distributed)
+    valid_loader = make_loader(validation_dataset, drop_last=True, distributed=distributed)
+    validation_loader = make_loader(validation_dataset, drop_last=False)
+    model, history = train_model(
+        args, model, train_loader, valid_loader, _rank=_rank
     )
-    model, history = train_model(args, train_loader, valid_loader)
+    if not is_main_process:
+        return
     threshold = np.mean(history["train"]) + 2 * np.std(history["train"])
     print(f"Threshold value: {threshold}")
 
@@ -1079,25 +1195,19 @@ def main(
     plot_loss(args, history, base_path=base_path, show_plots=show_plots)
 
     # # classification
-    with torch.no_grad():
-        mae = []
-        sequences = []
-        for data in validation_loader:
-            seq = data[0]
-            seq = seq.to(args.device)
-            sequences.append(seq[0, 0, 21].cpu().numpy().tolist())
-            pred_seq = model(seq)
-            loss = torch.mean(torch.abs(torch.squeeze(seq, 0) - pred_seq))
-            mae.append(loss.cpu().numpy())
-        mae = np.array(mae)
+    mae = reconstruction_errors(
+        model, validation_loader, len(validation_dataset), args.device
+    )
     error_df = pd.DataFrame(
         {
             "reconstruction_error": mae,
             "reconstruction_error_scaled": mae / np.max(mae),
-            "ground_truth": y_valid.tolist(),
-            "id": repeats_valid.tolist(),
-            "ch_22": sequences,
-        }
+            "ground_truth": y_valid,
+            "id": repeats_valid,
+            # first time step of channel 22, taken from the host copy
+            "ch_22": X_valid[:, 0, 21],
+        },
+        copy=False,
     )
     predictions = (error_df.reconstruction_error.values > threshold).astype(int)
     error_df["predictions"] = predictions
@@ -1111,8 +1221,43 @@ def main(
     )
 
 
+def _main_wrapper(rank, world_size, *main_args):
+    torch.distributed.init_process_group("nccl", rank=rank, world_size=world_size)
+    main(*main_args, _rank=rank)
+    torch.distributed.destroy_process_group()
+
+
+def distributed_main(*main_args):
+    """Run `main` with distributed data parallel training on multiple GPUs, one
+    process per GPU.
+
+    main_args: Must be ordered argument list for main(), excluding `_rank`
+    """
+    args = main_args[0]
+
+    assert args.distributed != 1
+    assert torch.distributed.is_available()
+
+    os.environ["MASTER_ADDR"] = "localhost"
+    os.environ["MASTER_PORT"] = "12355"
+
+    world_size = (
+        torch.cuda.device_count() if args.distributed == -1 else args.distributed
+    )
+
+    torch.multiprocessing.spawn(
+        _main_wrapper,
+        args=(world_size, *main_args),
+        nprocs=world_size,
+        join=True,
+    )
+
+
 if __name__ == "__main__":
     # initialize the argparse and the logger
     args, parser = TrainArguments().parse(verbose=True)
     logger = utils.get_logger(script_name=__name__)
-    main(args, logger, show_plots=False)
+    if args.distributed != 1:
+        distributed_main(args, logger, False)
+    else:
+        main(args, logger, show_plots=False)
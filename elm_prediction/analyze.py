@@ -58,6 +58,8 @@ class Analysis(object):
             self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.args.device = self.device
         self.device = torch.device(self.device)
+        self.mixed_precision = self.args.mixed_precision and self.device.type == 'cuda'
+        self.memory_format = torch.channels_last_3d if self.args.channels_last else torch.preserve_format
 
         self.output_dir = Path(self.args.output_dir)
         if not self.output_dir.is_absolute():
@@ -74,6 +76,8 @@ class Analysis(object):
         model_cls = utils.create_model_class(self.args.model_name)
         self.model = model_cls(self.args)
         self.model = self.model.to(self.device)
+        if self.args.channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last_3d)
         self.model.eval()
 
         # load the model checkpoint
@@ -82,6 +86,18 @@ class Analysis(object):
         model_dict = load_obj['model']
         self.model.load_state_dict(model_dict)
 
+        # full-data inference pads the last chunk of windows of each ELM up to
+        # `batch_size` (see `_calc_inference_full`), so every call has the same
+        # batch shape and CUDA graph capture removes most launch overhead
+        self.pad_inference_batches = False
+        if self.args.compile_model and self.device.type == 'cuda':
+            if hasattr(torch, 'compile'):
+                print("Compiling model with `torch.compile`")
+                self.model = torch.compile(self.model, mode="reduce-overhead")
+                self.pad_inference_batches = True
+            else:
+                print("`torch.compile` requires PyTorch >= 2.0; running in eager mode")
+
         self.training_output = None
         self.test_data = None
         self.valid_indices_data_loader = None
@@ -98,6 +114,10 @@ class Analysis(object):
         print(f"Loading test data file: {self.test_data_file.as_posix()}")
         with self.test_data_file.open("rb") as f:
             self.test_data = pickle.load(f)
+        # float32 once at load time so per-ELM slices convert without a copy
+        self.test_data['signals'] = np.ascontiguousarray(
+            self.test_data['signals'], dtype=np.float32,
+        )
 
         print("Test data:")
         for key, value in self.test_data.items():
@@ -114,12 +134,23 @@ class Analysis(object):
             self.test_data['sample_indices'],
             self.test_data['window_start'],
         )
-        # dataloader
+        # keep loader worker processes alive across passes
+        worker_kwargs = {}
+        if self.args.num_workers > 0:
+            worker_kwargs = dict(persistent_workers=True, prefetch_factor=4)
+        # dataloader; the dataset fetches whole batches of sample indices
+        # from `BatchSampler`
         self.valid_indices_data_loader = torch.utils.data.DataLoader(
             test_dataset,
-            batch_size=self.args.batch_size,
-            shuffle=False,
-            drop_last=True,
+            batch_size=None,  # must be disabled when using samplers
+            sampler=torch.utils.data.BatchSampler(
+                torch.utils.data.SequentialSampler(test_dataset),
+                batch_size=self.args.batch_size,
+                drop_last=True,
+            ),
+            num_workers=self.args.num_workers,
+            pin_memory=self.device.type == 'cuda',
+            **worker_kwargs,
         )
         inputs, _ = next(iter(self.valid_indices_data_loader))
         print(f"Input size: {inputs.shape}")
@@ -142,64 +173,104 @@ class Analysis(object):
         n_elms = elm_indices.size
         sws_plus_la = (self.args.signal_window_size - 1) + self.args.label_look_ahead
 
+        if max_elms:
+            n_elms_run = min(max_elms, n_elms)
+        else:
+            n_elms_run = n_elms
+        elm_stops = np.append(window_start[1:] - 1, labels.size)
+
+        # on cuda, the next ELM's signals are copied from pinned memory on a
+        # side stream while the model runs on the current ELM
+        copy_stream = torch.cuda.Stream(self.device) if self.device.type == 'cuda' else None
+
+        def upload_signals(i_elm: int) -> torch.Tensor:
+            # only the time points covered by a window are needed
+            n_time_points = elm_stops[i_elm] - window_start[i_elm] - self.args.label_look_ahead
+            elm_signals_t = torch.from_numpy(
+                signals[window_start[i_elm]:window_start[i_elm] + n_time_points]
+            )
+            if copy_stream is None:
+                return elm_signals_t.to(self.device)
+            elm_signals_t = elm_signals_t.pin_memory()
+            with torch.cuda.stream(copy_stream):
+                return elm_signals_t.to(self.device, non_blocking=True)
+
+        # sliding-window view function, fixed for all ELMs
+        sws = self.args.signal_window_size
+        if self.args.data_preproc == "gradient":
+            def make_windows(elm_signals_t: torch.Tensor) -> torch.Tensor:
+                # (T, 8, 8, 6) -> (6, T, 8, 8) once per ELM, then windows
+                # of shape (N, 6, W, 8, 8)
+                elm_signals_t = elm_signals_t.permute(3, 0, 1, 2).contiguous()
+                return elm_signals_t.unfold(1, sws, 1).permute(1, 0, 4, 2, 3)
+        else:
+            def make_windows(elm_signals_t: torch.Tensor) -> torch.Tensor:
+                # (T, 8, 8) -> windows of shape (N, 1, W, 8, 8)
+                return elm_signals_t.unfold(0, sws, 1).permute(0, 3, 1, 2).unsqueeze(1)
+
         print('Running inference on full test data')
         elm_predictions = {}
-        with torch.no_grad():
-            for i_elm, elm_index in enumerate(elm_indices):
-                if max_elms and i_elm >= max_elms:
-                    break
+        with torch.inference_mode():
+            next_signals_t = upload_signals(0) if n_elms_run else None
+            for i_elm, elm_index in enumerate(elm_indices[:n_elms_run]):
                 i_start = window_start[i_elm]
-                if i_elm < n_elms - 1:
-                    i_stop = window_start[i_elm + 1] - 1
-                else:
-                    i_stop = labels.size
+                i_stop = elm_stops[i_elm]
                 elm_signals = signals[i_start:i_stop, ...]
                 elm_labels = labels[i_start:i_stop]
                 print(f"ELM {elm_indices[i_elm]:5d} ({i_elm+1:3d} of {n_elms})  "
                     f"Signal size: {elm_signals.shape}")
-                predictions = []
                 effective_len = elm_labels.size - sws_plus_la
-                for j in range(effective_len):
-                    input_signals = elm_signals[j: j + self.args.signal_window_size, ...]
-                    input_signals = input_signals.reshape([1, 1, self.args.signal_window_size, 8, 8])
-                    input_signals = torch.as_tensor(input_signals, dtype=torch.float32)
-                    input_signals = input_signals.to(self.device)
-                    outputs = self.model(input_signals)
-                    predictions.append(outputs.item())
-                predictions = np.array(predictions)
+                # the ELM signals are copied to the device once; the sliding
+                # windows are a zero-copy view of shape (N, C, W, 8, 8)
+                elm_signals_t = next_signals_t
+                if copy_stream is not None:
+                    torch.cuda.current_stream(self.device).wait_stream(copy_stream)
+                    elm_signals_t.record_stream(torch.cuda.current_stream(self.device))
+                # start copying the next ELM before running this one
+                if i_elm + 1 < n_elms_run:
+                    next_signals_t = upload_signals(i_elm + 1)
+                windows = make_windows(elm_signals_t)
+                # run inference in chunks of `batch_size` windows; the leading
+                # `sws_plus_la` time points have no prediction and stay zero
+                predictions = torch.zeros(elm_labels.size, dtype=torch.float32, device=self.device)
+                window_predictions = predictions[sws_plus_la:]
+                for k in range(0, effective_len, self.args.batch_size):
+                    batch = windows[k: k + self.args.batch_size]
+                    n_windows = batch.shape[0]
+                    if self.pad_inference_batches and n_windows < self.args.batch_size:
+                        # repeat the last window to keep the compiled batch
+                        # shape; the extra outputs are dropped below
+                        padding = batch[-1:].expand(self.args.batch_size - n_windows, *batch.shape[1:])
+                        batch = torch.cat([batch, padding])
+                    # `contiguous` does not accept `torch.preserve_format`
+                    if self.args.channels_last:
+                        batch = batch.contiguous(memory_format=torch.channels_last_3d)
+                    else:
+                        batch = batch.contiguous()
+                    with torch.autocast(device_type=self.device.type, enabled=self.mixed_precision):
+                        outputs = self.model(batch)
+                    window_predictions[k: k + n_windows] = outputs.view(-1)[:n_windows]
                 # micro predictions
                 if self.is_classification:
-                    predictions = torch.sigmoid(
-                        torch.as_tensor(predictions, dtype=torch.float32)
-                    ).cpu().numpy()
-                predictions = np.pad(
-                    predictions,
-                    pad_width=(sws_plus_la, 0),
-                    mode="constant",
-                    constant_values=0,
-                )
+                    window_predictions.sigmoid_()
+                predictions = predictions.cpu().numpy()
                 if self.is_classification:
                     # macro predictions
-                    active_elm = np.where(elm_labels > 0.0)[0]
-                    active_elm_start = active_elm[0]
+                    active_elm = elm_labels > 0.0
+                    # first active index without materializing all indices
+                    active_elm_start = int(np.argmax(active_elm))
+                    assert active_elm[active_elm_start], f"ELM {elm_index} has no active labels"
                     active_elm_lower_buffer = active_elm_start - self.args.truncate_buffer
                     active_elm_upper_buffer = active_elm_start + self.args.truncate_buffer
-                    micro_predictions_pre_active_elms = \
-                        predictions[:active_elm_lower_buffer]
-                    macro_predictions_pre_active_elms = np.array(
-                        [np.any(micro_predictions_pre_active_elms > threshold).astype(int)]
-                    )
-                    micro_predictions_active_elms = \
-                        predictions[active_elm_lower_buffer:active_elm_upper_buffer]
-                    macro_predictions_active_elms = np.array(
-                        [np.any(micro_predictions_active_elms > threshold).astype(int)]
-                    )
+                    # threshold once, then reduce the pre-active and active slices
+                    above_threshold = predictions > threshold
                     macro_labels = np.array([0, 1], dtype="int")
-                    macro_predictions = np.concatenate(
+                    macro_predictions = np.array(
                         [
-                            macro_predictions_pre_active_elms,
-                            macro_predictions_active_elms,
-                        ]
+                            above_threshold[:active_elm_lower_buffer].any(),
+                            above_threshold[active_elm_lower_buffer:active_elm_upper_buffer].any(),
+                        ],
+                        dtype="int",
                     )
                 else:
                     macro_labels = None
@@ -215,6 +286,19 @@ class Analysis(object):
 
         self.elm_predictions = elm_predictions
 
+    def _get_dict_values(self, label_key: str, prediction_key: str):
+        # concatenate per-ELM arrays into single preallocated buffers
+        elm_data = list(self.elm_predictions.values())
+        sizes = [vals[label_key].size for vals in elm_data]
+        targets = np.empty(sum(sizes), dtype=elm_data[0][label_key].dtype)
+        predictions = np.empty(sum(sizes), dtype=elm_data[0][prediction_key].dtype)
+        offset = 0
+        for vals, size in zip(elm_data, sizes):
+            targets[offset:offset + size] = vals[label_key]
+            predictions[offset:offset + size] = vals[prediction_key]
+            offset += size
+        return targets, predictions
+
     def plot_training_epochs(self):
         if self.training_output is None:
             self._load_training_output()
@@ -258,11 +342,12 @@ class Analysis(object):
         predictions = []
         targets = []
         print('Running inference on valid indices')
-        with torch.no_grad():
+        with torch.inference_mode():
             for images, labels in tqdm(self.valid_indices_data_loader):
-                images = images.to(self.device)
-                preds = self.model(images)
-                preds = preds.view(-1)
+                images = images.to(self.device, non_blocking=True, memory_format=self.memory_format)
+                with torch.autocast(device_type=self.device.type, enabled=self.mixed_precision):
+                    preds = self.model(images)
+                preds = preds.float().view(-1)
                 if self.args.regression is False:
                     predictions.append(torch.sigmoid(preds).cpu().numpy())
                 else:
@@ -280,9 +365,11 @@ class Analysis(object):
             if threshold is None:
                 threshold = self.args.threshold
             print(f'F1 threshold: {threshold:.2f}')
+            # threshold once; a uint8 view of the boolean mask avoids an int64 copy
+            bool_predictions = (predictions > threshold).view(np.uint8)
             f1 = metrics.f1_score(
                 targets,
-                (predictions > threshold).astype(int),
+                bool_predictions,
                 zero_division=0,
             )
             print(f"F1 score on valid indices: {f1:.4f}")
@@ -310,7 +397,6 @@ class Analysis(object):
             plt.xlim(0,1)
             plt.legend()
             # calc confusion matrix
-            bool_predictions = (predictions > threshold).astype(int)
             cm = metrics.confusion_matrix(targets, bool_predictions)
             # plot confusion matrix
             plt.sca(axes.flat[2])
@@ -339,37 +425,56 @@ class Analysis(object):
         ):
         if not self.elm_predictions:
             self._calc_inference_full(max_elms=max_elms)
-        elm_indices = self.test_data['elm_indices']
-        n_elms = elm_indices.size
+        n_elms = len(self.elm_predictions)
         i_page = 1
+        fig = None
         for i_elm, elm_index in enumerate(self.elm_predictions):
-            # if i_elm >= len(self.elm_predictions):
-            #     break
-            if i_elm % 6 == 0:
-                _, axes = plt.subplots(ncols=3, nrows=2, figsize=(12, 6))
-                plt.suptitle(f"{self.run_dir_short} | Test data (full)")
+            i_axis = i_elm % 6
+            if i_axis == 0 and (fig is None or not self.save):
+                # when saving, a single figure and its line artists are reused
+                # for every page; otherwise keep one figure per page for `show()`
+                fig, axes = plt.subplots(ncols=3, nrows=2, figsize=(12, 6))
+                fig.suptitle(f"{self.run_dir_short} | Test data (full)")
+                lines = []
+                for axis in axes.flat:
+                    lines.append([
+                        axis.plot([], [], label=label)[0]
+                        for label in ["BES ch 22", "Ground truth", "Prediction"]
+                    ])
+                    axis.set_xlabel("Time (micro-s)")
+                    axis.set_ylabel("Signal | label")
+                    axis.legend(fontsize='small')
+                need_layout = True
             elm_data = self.elm_predictions[elm_index]
             signals = elm_data["signals"]
             labels = elm_data["labels"]
             predictions = elm_data["predictions"]
             elm_time = np.arange(labels.size)
             # plot signal, labels, and prediction
-            plt.sca(axes.flat[i_elm % 6])
-            plt.plot(elm_time, signals[:, 2, 6] / np.max(signals[:, 2, 6]), label="BES ch 22")
-            plt.plot(elm_time, labels, label="Ground truth")
-            plt.plot(elm_time, predictions, label="Prediction")
-            plt.xlabel("Time (micro-s)")
-            plt.ylabel("Signal | label")
-            # plt.ylim([None, 1.1])
-            plt.legend(fontsize='small')
-            plt.title(f'ELM index {elm_index}')
-            if i_elm % 6 == 5 or i_elm == n_elms-1:
-                plt.tight_layout()
+            axis = axes.flat[i_axis]
+            axis.set_visible(True)
+            signal_line, label_line, prediction_line = lines[i_axis]
+            bes_ch22 = signals[:, 2, 6]
+            signal_line.set_data(elm_time, bes_ch22 / bes_ch22.max())
+            label_line.set_data(elm_time, labels)
+            prediction_line.set_data(elm_time, predictions)
+            axis.relim()
+            axis.autoscale_view()
+            axis.set_title(f'ELM index {elm_index}')
+            if i_axis == 5 or i_elm == n_elms-1:
+                # hide unused axes on a partial last page
+                for unused_axis in axes.flat[i_axis + 1:]:
+                    unused_axis.set_visible(False)
+                if need_layout:
+                    fig.tight_layout()
+                    need_layout = False
                 if self.save:
                     filepath = self.analysis_dir / f'inference_{i_page:02d}.pdf'
                     print(f'Saving inference file: {filepath.as_posix()}')
-                    plt.savefig(filepath.as_posix(), format='pdf', transparent=True)
+                    fig.savefig(filepath.as_posix(), format='pdf', transparent=True)
                     i_page += 1
+        if self.save and fig is not None:
+            plt.close(fig)
         # merge PDFs
         if self.save:
             pdf_files = sorted(self.analysis_dir.glob('inference_*.pdf'))
@@ -389,14 +494,10 @@ class Analysis(object):
         plt.suptitle(f"{self.run_dir_short} | Test data (full)")
         for mode in ['micro', 'macro']:
             # gather micro/macro results
-            targets = []
-            predictions = []
-            for vals in self.elm_predictions.values():
-                predictions.append(vals[f"{mode}_predictions"])
-                label_key = 'labels' if mode == 'micro' else 'macro_labels'
-                targets.append(vals[label_key])
-            predictions = np.concatenate(predictions)
-            targets = np.concatenate(targets)
+            if mode == 'micro':
+                targets, predictions = self._get_dict_values('labels', 'predictions')
+            else:
+                targets, predictions = self._get_dict_values('macro_labels', 'macro_predictions')
             # plot ROC (micro only)
             if mode == 'micro':
                 fpr, tpr, thresh = metrics.roc_curve(targets, predictions)
@@ -421,7 +522,7 @@ class Analysis(object):
                 plt.legend()
             # confusion matrix heatmaps
             if mode == 'micro':
-                bool_predictions = (predictions > threshold).astype(int)
+                bool_predictions = (predictions > threshold).view(np.uint8)
                 cm = metrics.confusion_matrix(targets, bool_predictions)
             else:
                 cm = metrics.confusion_matrix(targets, predictions)
@@ -11,6 +11,12 @@ import numpy as np
 from numpy import ndarray
 from sklearn import model_selection
 
+try:
+    # registers the bitshuffle/LZ4 filters for files repacked by `src/repack_h5.py`
+    import hdf5plugin
+except ImportError:
+    pass
+
 
 class BaseData:
     def __init__(
@@ -140,10 +146,9 @@ class BaseData:
 
     def _get_valid_indices(
         self,
-        signals: np.ndarray,
         labels: np.ndarray,
         verbose=False,
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ) -> Tuple[slice, np.ndarray, np.ndarray]:
         """Helper function to concatenate the signals and labels for the ELM events
         for a given mode. It also creates allowed indices to sample from with respect
         to signal window size and label look ahead. See the README to know more
@@ -172,14 +177,14 @@ class BaseData:
 
         Returns:
         --------
-            Tuple[ np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray ]: Tuple containing
-                signals, labels, valid_t0, start and stop indices appended with current
-                time data point.
+            Tuple[slice, np.ndarray, np.ndarray]: Tuple containing the range of
+                signal time points to keep, labels and valid_t0. Only the labels
+                are needed, so the signals can be read after this call.
         """
-        # indices for active elm times in each elm event
-        active_elm_indices = np.nonzero(labels == 1)[0]
-        active_elm_start_index = active_elm_indices[0]
-        active_elm_stop_index = active_elm_indices[-1]
+        # first and last active elm times in each elm event
+        active_elm_mask = labels == 1
+        active_elm_start_index = np.argmax(active_elm_mask)
+        active_elm_stop_index = labels.size - 1 - np.argmax(active_elm_mask[::-1])
 
         # method for establishing valid t0 indices
         method = self.args.valid_indices_method
@@ -188,7 +193,7 @@ class BaseData:
             # `t0` is first index (or earliest time, or trailing time point) for signal window
             # `valid_t0` denotes valid `t0` time points for signal window
             # initialize to zeros
-            valid_t0 = np.zeros(labels.shape, dtype=np.int32)
+            valid_t0 = np.zeros(labels.shape, dtype=np.int8)
             # largest `t0` index with signal window in pre-ELM period
             largest_t0_index_for_pre_elm_period = active_elm_start_index - self.args.signal_window_size
             if largest_t0_index_for_pre_elm_period < 0:
@@ -198,8 +203,6 @@ class BaseData:
             assert labels[largest_t0_index_for_pre_elm_period + (self.args.signal_window_size-1) + 1] == 1
             # `t0` time points up to `largest_t0` are valid
             valid_t0[0:largest_t0_index_for_pre_elm_period+1] = 1
-            assert valid_t0[largest_t0_index_for_pre_elm_period    ] == 1
-            assert valid_t0[largest_t0_index_for_pre_elm_period + 1] == 0
             # labels after ELM onset should be active ELM, even if in post-ELM period
             last_label_for_active_elm_in_pre_elm_signal = (
                 largest_t0_index_for_pre_elm_period
@@ -207,7 +210,6 @@ class BaseData:
                 + self.args.label_look_ahead
             )
             labels[ active_elm_start_index : last_label_for_active_elm_in_pre_elm_signal+1 ] = 1
-            assert labels[last_label_for_active_elm_in_pre_elm_signal] == 1
 
             sufficient_post_elm_period = (active_elm_stop_index+1000 
                                             + (self.args.signal_window_size-1) 
@@ -224,24 +226,25 @@ class BaseData:
             if method == 3:
                 # adjust labels so active ELM is true for all post-onset time points
                 labels[active_elm_start_index+1:] = 1
-                assert labels[-1] == 1
 
             # # `t0` within sws+la of end are invalid
-            valid_t0 = np.ones(labels.shape, dtype=np.int32)
+            valid_t0 = np.ones(labels.shape, dtype=np.int8)
             sws_plus_la = self.args.signal_window_size + self.args.label_look_ahead
             valid_t0[ -sws_plus_la + 1 : ] = 0
         else:
             raise ValueError
 
         if verbose:
+            n_valid_t0 = np.count_nonzero(valid_t0)
             self.logger.info(f'  Total time points {labels.size}')
             self.logger.info(f'  Pre-ELM time points {active_elm_start_index}')
-            self.logger.info(f'  Active ELM time points {active_elm_indices.size}')
+            self.logger.info(f'  Active ELM time points {np.count_nonzero(active_elm_mask)}')
             self.logger.info(f'  Post-ELM time points {labels.size - active_elm_stop_index-1}')
-            self.logger.info(f'  Cound valid t0: {np.count_nonzero(valid_t0)}')
-            self.logger.info(f'  Cound invalid t0: {np.count_nonzero(valid_t0-1)}')
+            self.logger.info(f'  Cound valid t0: {n_valid_t0}')
+            self.logger.info(f'  Cound invalid t0: {valid_t0.size - n_valid_t0}')
 
-        return (signals, labels, valid_t0)
+        # all signal time points matching the labels are kept
+        return (slice(0, labels.size), labels, valid_t0)
 
     def _partition_elms(
         self, 
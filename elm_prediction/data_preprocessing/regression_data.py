@@ -16,10 +16,9 @@ class RegressionData(UnprocessedData):
 
     def _get_valid_indices(
         self,
-        signals: np.ndarray,
         labels: np.ndarray,
         verbose=False,
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ) -> Tuple[slice, np.ndarray, np.ndarray]:
         """Helper function to concatenate the signals and labels for the ELM events
         for a given mode. It also creates allowed indices to sample from with respect
         to signal window size and label look ahead. See the README to know more
@@ -48,9 +47,9 @@ class RegressionData(UnprocessedData):
 
         Returns:
         --------
-            Tuple[ np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray ]: Tuple containing
-                signals, labels, valid_t0, start and stop indices appended with current
-                time data point.
+            Tuple[slice, np.ndarray, np.ndarray]: Tuple containing the range of
+                signal time points to keep (the pre-ELM period), time-to-ELM labels
+                and valid_t0.
         """
         # indices for active elm times in each elm event
         active_elm_indices = np.nonzero(labels == 1)[0]
@@ -60,7 +59,8 @@ class RegressionData(UnprocessedData):
         valid_t0 = np.ones(active_elm_start_index-1, dtype=np.int32)
         valid_t0[-self.args.signal_window_size + 1:] = 0
         labels = np.arange(active_elm_start_index, 1, -1, dtype=float)
-        signals = signals[:active_elm_start_index-1, :, :]
+        # only the pre-ELM signal time points are kept
+        signal_range = slice(0, active_elm_start_index-1)
 
         if self.args.regression == 'log':
             if np.any(labels == 0):
@@ -75,4 +75,4 @@ class RegressionData(UnprocessedData):
             self.logger.info(f'  Cound valid t0: {np.count_nonzero(valid_t0)}')
             self.logger.info(f'  Cound invalid t0: {np.count_nonzero(valid_t0-1)}')
 
-        return (signals, labels, valid_t0)
+        return (signal_range, labels, valid_t0)
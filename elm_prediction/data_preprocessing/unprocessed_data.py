@@ -45,127 +45,108 @@ class UnprocessedData(BaseData):
                 original signals, correponding labels, sample indices obtained
                 after upsampling and start index for each ELM event.
         """
-        packaged_signals = None
-        packaged_window_start = None
-        packaged_valid_t0 = []
-        packaged_labels = []
-
         # get ELM indices from the data file if not provided
         if elm_indices is None:
             elm_indices = self.elm_indices
 
-        # iterate through all the ELM indices
+        # pass 1: read only the labels to find the valid indices and the number
+        # of time points kept for each ELM event
+        elm_results = []
         with h5py.File(self.datafile, 'r') as hf:
-            if save_filename:
-                # if self.args.regression:
-                #     save_filename += '_regression'
-                #     if self.args.regression == 'log':
-                #         save_filename += '_log'
-                plt.ioff()
-                _, axes = plt.subplots(nrows=3, ncols=4, figsize=(16, 9))
-                output_dir = Path(self.args.output_dir)
-                save_filename_extended = f"{save_filename}_valid_indices"
-                self.logger.info(f"  Saving valid indices as `{save_filename_extended}.pdf`")
-                i_page = 1
+            for elm_index in elm_indices:
+                elm_results.append(
+                    self._process_elm_labels(hf, elm_index, verbose=verbose)
+                )
+        kept_elms = [
+            (i_elm, result) for i_elm, result in enumerate(elm_results) if result
+        ]
+        kept_position = {i_elm: i_kept for i_kept, (i_elm, _) in enumerate(kept_elms)}
+        elm_sizes = np.array([labels.size for _, (_, labels, _) in kept_elms], dtype=int)
+        packaged_window_start = np.cumsum(elm_sizes) - elm_sizes
+        n_time_points = int(elm_sizes.sum())
+
+        # pass 2: read the signals of the kept ELM events straight into their
+        # slices of a single preallocated buffer
+        packaged_signals = np.empty((n_time_points, 8, 8), dtype=np.float32)
+        with h5py.File(
+            self.datafile, 'r', rdcc_nbytes=64*1024*1024, rdcc_nslots=100003,
+        ) as hf:
+            for i_start, n_elm_time_points, (i_elm, (signal_range, _, _)) in zip(
+                packaged_window_start, elm_sizes, kept_elms,
+            ):
+                self._read_elm_signals(
+                    hf,
+                    elm_indices[i_elm],
+                    signal_range=signal_range,
+                    out=packaged_signals[i_start:i_start + n_elm_time_points],
+                )
+
+        if save_filename:
+            # if self.args.regression:
+            #     save_filename += '_regression'
+            #     if self.args.regression == 'log':
+            #         save_filename += '_log'
+            plt.ioff()
+            _, axes = plt.subplots(nrows=3, ncols=4, figsize=(16, 9))
+            output_dir = Path(self.args.output_dir)
+            save_filename_extended = f"{save_filename}_valid_indices"
+            self.logger.info(f"  Saving valid indices as `{save_filename_extended}.pdf`")
+            i_page = 1
             for i_elm, elm_index in enumerate(elm_indices):
-                if save_filename and i_elm%12==0:
+                if i_elm%12==0:
                     for axis in axes.flat:
                         plt.sca(axis)
                         plt.cla()
-                elm_key = f"{elm_index:05d}"
-                if verbose:
-                    self.logger.info(f' ELM index {elm_index}')
-                elm_event = hf[elm_key]
-                signals = np.array(elm_event["signals"], dtype=np.float32)
-                # transposing so that the time dimension comes forward
-                signals = np.transpose(signals, (1, 0)).reshape(-1, 8, 8)
-                if self.args.automatic_labels:
-                    labels = np.array(elm_event["automatic_labels"], dtype=np.float32)
-                else:
-                    try:
-                        labels = np.array(elm_event["labels"], dtype=np.float32)
-                    except KeyError:
-                        labels = np.array(elm_event["manual_labels"], dtype=np.float32)
-
-                if self.args.normalize_data:
-                    signals = signals.reshape(-1, 64)
-                    signals[:, :32] = signals[:, :32] / np.max(signals[:, :32])
-                    signals[:, 32:] = signals[:, 32:] / np.max(signals[:, 32:])
-                    signals = signals.reshape(-1, 8, 8)
-
-                if self.args.truncate_inputs:
-                    active_elm_indices = np.where(labels > 0)[0]
-                    elm_end_index = active_elm_indices[-1] + self.args.truncate_buffer
-                    signals = signals[:elm_end_index, ...]
-                    labels = labels[:elm_end_index]
-                
-                result = self._get_valid_indices(
-                    signals=signals,
-                    labels=labels,
-                    verbose=verbose,
-                )
-                if result:
-                    (signals, labels, valid_t0) = result
-                else:
+                if not elm_results[i_elm]:
                     continue
-
-                if save_filename:
-                    plt.sca(axes.flat[i_elm%12])
-                    plt.plot(signals[:,2,3]/10, label='BES 20')
-                    plt.plot(signals[:,2,5]/10, label='BES 22')
-                    plt.plot(labels, label='Label')
-                    _valid_t0 = np.array(valid_t0, copy=True, dtype=float)
-                    _valid_tstop = np.zeros(labels.size)
-                    _valid_label = np.zeros(labels.size)
-                    valid_t0_indices = np.nonzero(valid_t0)[0]
-                    valid_tstop_indices = valid_t0_indices + self.args.signal_window_size - 1
-                    valid_label_indices = valid_tstop_indices + self.args.label_look_ahead
-                    assert _valid_t0[0] == 1
-                    assert valid_tstop_indices[-1] <= labels.size-1
-                    assert valid_label_indices[-1] <= labels.size-1
-                    _valid_t0[valid_t0_indices] = 0.1
-                    _valid_tstop[valid_tstop_indices] = 0.2
-                    _valid_label[valid_label_indices] = 0.3
-                    _valid_t0[_valid_t0 == 0] = np.nan
-                    _valid_tstop[_valid_tstop == 0] = np.nan
-                    _valid_label[_valid_label == 0] = np.nan
-                    plt.plot(_valid_t0, label='Valid t0')
-                    plt.plot(_valid_tstop, label='Valid tstop')
-                    plt.plot(_valid_label, label='Valid label')
-                    plt.title(f"ELM index {elm_key}")
-                    plt.legend(fontsize='x-small')
-                    plt.xlabel('Time (mu-s)')
-                    if i_elm%12==11 or i_elm==elm_indices.size-1:
-                        plt.tight_layout()
-                        filename = output_dir / f"{save_filename_extended}_{i_page:02d}.pdf"
-                        plt.savefig(filename.as_posix(), format="pdf", transparent=True)
-                        i_page += 1
-
-                if packaged_signals is None:
-                    packaged_window_start = np.array([0])
-                    packaged_valid_t0 = valid_t0
-                    packaged_signals = signals
-                    packaged_labels = labels
-                else:
-                    last_index = packaged_labels.size - 1
-                    packaged_window_start = np.append(
-                        packaged_window_start, 
-                        last_index + 1
-                    )
-                    packaged_valid_t0 = np.concatenate([packaged_valid_t0, valid_t0])
-                    packaged_signals = np.concatenate([packaged_signals, signals], axis=0)
-                    packaged_labels = np.concatenate([packaged_labels, labels], axis=0)                
-
-        if save_filename:
+                (_, labels, valid_t0) = elm_results[i_elm]
+                i_start = packaged_window_start[kept_position[i_elm]]
+                signals = packaged_signals[i_start:i_start + labels.size]
+                elm_key = f"{elm_index:05d}"
+                valid_t0_indices = np.flatnonzero(valid_t0)
+                plt.sca(axes.flat[i_elm%12])
+                plt.plot(signals[:,2,3]/10, label='BES 20')
+                plt.plot(signals[:,2,5]/10, label='BES 22')
+                plt.plot(labels, label='Label')
+                _valid_t0 = np.array(valid_t0, copy=True, dtype=float)
+                _valid_tstop = np.zeros(labels.size)
+                _valid_label = np.zeros(labels.size)
+                valid_tstop_indices = valid_t0_indices + self.args.signal_window_size - 1
+                valid_label_indices = valid_tstop_indices + self.args.label_look_ahead
+                assert _valid_t0[0] == 1
+                assert valid_tstop_indices[-1] <= labels.size-1
+                assert valid_label_indices[-1] <= labels.size-1
+                _valid_t0[valid_t0_indices] = 0.1
+                _valid_tstop[valid_tstop_indices] = 0.2
+                _valid_label[valid_label_indices] = 0.3
+                _valid_t0[_valid_t0 == 0] = np.nan
+                _valid_tstop[_valid_tstop == 0] = np.nan
+                _valid_label[_valid_label == 0] = np.nan
+                plt.plot(_valid_t0, label='Valid t0')
+                plt.plot(_valid_tstop, label='Valid tstop')
+                plt.plot(_valid_label, label='Valid label')
+                plt.title(f"ELM index {elm_key}")
+                plt.legend(fontsize='x-small')
+                plt.xlabel('Time (mu-s)')
+                if i_elm%12==11 or i_elm==elm_indices.size-1:
+                    plt.tight_layout()
+                    filename = output_dir / f"{save_filename_extended}_{i_page:02d}.pdf"
+                    plt.savefig(filename.as_posix(), format="pdf", transparent=True)
+                    i_page += 1
             plt.close()
             pdf_files = sorted(output_dir.glob(f'{save_filename_extended}_*.pdf'))
             output = output_dir / f'{save_filename_extended}.pdf'
             utils.merge_pdfs(pdf_files, output, delete_inputs=True)
 
-        # valid indices for data sampling
-        packaged_valid_t0_indices = np.arange(packaged_valid_t0.size, dtype="int")
-        packaged_valid_t0_indices = packaged_valid_t0_indices[packaged_valid_t0 == 1]
+        # labels and valid indices are small next to the signals
+        packaged_labels = np.empty(n_time_points, dtype=np.float32)
+        packaged_valid_t0_indices = []
+        for i_start, (_, (_, labels, valid_t0)) in zip(packaged_window_start, kept_elms):
+            packaged_labels[i_start:i_start + labels.size] = labels
+            packaged_valid_t0_indices.append(np.flatnonzero(valid_t0) + i_start)
+        packaged_valid_t0_indices = np.concatenate(packaged_valid_t0_indices)
 
+        # valid indices for data sampling
         packaged_label_indices_for_valid_t0 = (
             packaged_valid_t0_indices 
             + (self.args.signal_window_size-1)
@@ -193,11 +174,10 @@ class UnprocessedData(BaseData):
                 - (self.args.signal_window_size-1)
                 - self.args.label_look_ahead
             )
-            for i in np.arange(oversample_factor-1):
-                packaged_valid_t0_indices = np.append(
-                    packaged_valid_t0_indices,
-                    packaged_active_elm_valid_t0_indices,
-                )
+            packaged_valid_t0_indices = np.concatenate([
+                packaged_valid_t0_indices,
+                np.tile(packaged_active_elm_valid_t0_indices, oversample_factor-1),
+            ])
             packaged_label_indices_for_valid_t0 = (
                 packaged_valid_t0_indices
                 + (self.args.signal_window_size-1)
@@ -230,6 +210,76 @@ class UnprocessedData(BaseData):
         return (packaged_signals, packaged_labels, packaged_valid_t0_indices, packaged_window_start, elm_indices)
 
 
+    def _process_elm_labels(
+        self,
+        hf: h5py.File,
+        elm_index: int,
+        verbose: bool = False,
+    ) -> Union[Tuple[slice, np.ndarray, np.ndarray], None]:
+        """Read and truncate the labels of a single ELM event and find its valid
+        indices. Only the labels are read from the data file.
+
+        Returns:
+        --------
+            Tuple[slice, np.ndarray, np.ndarray] or None: Range of signal time
+                points to keep, labels and valid t0 mask of the ELM event, or None
+                if the event has no valid signal window.
+        """
+        elm_key = f"{elm_index:05d}"
+        if verbose:
+            self.logger.info(f' ELM index {elm_index}')
+        elm_event = hf[elm_key]
+        if self.args.automatic_labels:
+            labels = np.array(elm_event["automatic_labels"], dtype=np.float32)
+        else:
+            try:
+                labels = np.array(elm_event["labels"], dtype=np.float32)
+            except KeyError:
+                labels = np.array(elm_event["manual_labels"], dtype=np.float32)
+
+        if self.args.truncate_inputs:
+            # last active index without materializing all indices
+            active_elm = labels > 0
+            elm_end_index = labels.size - 1 - int(np.argmax(active_elm[::-1]))
+            elm_end_index += self.args.truncate_buffer
+            labels = labels[:elm_end_index]
+
+        # valid indices only depend on the labels
+        return self._get_valid_indices(
+            labels=labels,
+            verbose=verbose,
+        )
+
+    def _read_elm_signals(
+        self,
+        hf: h5py.File,
+        elm_index: int,
+        signal_range: slice,
+        out: np.ndarray,
+    ) -> None:
+        """Read and normalize the signals of a single ELM event into `out`, a
+        `(n_time_points, 8, 8)` slice of the packaged signals buffer. Only the
+        time points in `signal_range` (from `_get_valid_indices`) are kept.
+        """
+        # read straight into a float32 (64, T) buffer as stored on disk
+        signals_dataset = hf[f"{elm_index:05d}"]["signals"]
+        channel_major = np.empty(signals_dataset.shape, dtype=np.float32)
+        signals_dataset.read_direct(channel_major)
+
+        # single pass over the kept time points into the time-major output;
+        # normalization is fused into the copy with per-channel maxima taken
+        # over the full (untruncated) event
+        kept_signals = channel_major[:, signal_range].T
+        assert kept_signals.shape[0] == out.shape[0]
+        if self.args.normalize_data:
+            channel_max = np.empty(64, dtype=np.float32)
+            channel_max[:32] = np.max(channel_major[:32])
+            channel_max[32:] = np.max(channel_major[32:])
+            np.divide(kept_signals, channel_max, out=out.reshape(-1, 64))
+        else:
+            np.copyto(out.reshape(-1, 64), kept_signals)
+
+
 if __name__=="__main__":
     arg_list = [
         '--use_all_data', 
@@ -7,10 +7,6 @@ import torch.nn as nn
 import pywt
 from pytorch_wavelets.dwt.transform1d import DWT1DForward
 
-try:
-    from ..src import torch_dct as dct
-except ImportError:
-    import elm_prediction.src.torch_dct as dct
 
 class _FeatureBase(nn.Module):
     def __init__(
@@ -24,12 +20,6 @@ class _FeatureBase(nn.Module):
         # spatial maxpool
         self.maxpool_size = self.args.mf_maxpool_size
         assert self.maxpool_size in [1, 2, 4]
-        if self.maxpool_size > 1:
-            self.maxpool = nn.MaxPool3d(
-                kernel_size=[1, self.maxpool_size, self.maxpool_size],
-            )
-        else:
-            self.maxpool = None
 
         # signal window
         self.signal_window_size = self.args.signal_window_size
@@ -41,6 +31,16 @@ class _FeatureBase(nn.Module):
         assert np.log2(self.time_slice_interval) % 1 == 0  # ensure power of 2
         self.time_points = self.signal_window_size // self.time_slice_interval
 
+        # time slicing and spatial maxpool in one pass: a time kernel of 1 with
+        # a time stride of `time_slice_interval` is the same as data[::interval]
+        if self.maxpool_size > 1 or self.time_slice_interval > 1:
+            self.maxpool = nn.MaxPool3d(
+                kernel_size=[1, self.maxpool_size, self.maxpool_size],
+                stride=[self.time_slice_interval, self.maxpool_size, self.maxpool_size],
+            )
+        else:
+            self.maxpool = None
+
         # subwindows
         self.subwindow_size = self.args.subwindow_size
         if self.subwindow_size == -1:
@@ -56,9 +56,32 @@ class _FeatureBase(nn.Module):
         self.num_filters = None  # set in subclass
         self.conv = None  # set in subclass
 
+    def _make_subwindow_conv(self, filter_size: tuple) -> nn.Conv3d:
+        # one filter bank (each with self.num_filters) per subwindow, as a
+        # single grouped convolution with one input channel per subwindow
+        return nn.Conv3d(
+            in_channels=self.subwindow_nbins,
+            out_channels=self.num_filters * self.subwindow_nbins,
+            kernel_size=filter_size,
+            groups=self.subwindow_nbins,
+        )
+
+    def _subwindow_conv(self, x: torch.Tensor) -> torch.Tensor:
+        # (N, subwindow_nbins, ...) -> (N, subwindow_nbins, num_filters, 1, 1, 1)
+        x = self.conv(x)
+        return x.view(x.shape[0], self.subwindow_nbins, self.num_filters, 1, 1, 1)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # convert checkpoints saved with one Conv3d per subwindow (`conv.<i_bin>.*`)
+        for name in ['weight', 'bias']:
+            old_keys = [f"{prefix}conv.{i_bin}.{name}" for i_bin in range(self.subwindow_nbins)]
+            if all(key in state_dict for key in old_keys):
+                state_dict[f"{prefix}conv.{name}"] = torch.cat(
+                    [state_dict.pop(key) for key in old_keys]
+                )
+        super(_FeatureBase, self)._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
     def _time_interval_and_maxpool(self, x: torch.Tensor) -> torch.Tensor:
-        if self.time_slice_interval > 1:
-            x = x[:, :, ::self.time_slice_interval, :, :]
         if self.maxpool:
             x = self.maxpool(x)
         return x
@@ -217,35 +240,16 @@ class RawFeatureModel(_FeatureBase):
             8 // self.maxpool_size,
         )
 
-        # list of conv. filter banks (each with self.num_filters) with size self.subwindow_bins
-        self.conv = nn.ModuleList(
-            [
-                nn.Conv3d(
-                    in_channels=1,
-                    out_channels=self.num_filters,
-                    kernel_size=filter_size,
-                ) for i_subwindow in range(self.subwindow_nbins)
-            ]
-        )
+        self.conv = self._make_subwindow_conv(filter_size)
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         x = self._time_interval_and_maxpool(x)
-        x_new_size = [
-            x.shape[0],
-            self.num_filters,
-            self.subwindow_nbins,
-            1,
-            1,
-        ]
-        x_new = torch.empty(size=x_new_size, dtype=x.dtype, device=x.device)
-        for i_bin in range(self.subwindow_nbins):
-            i_start = i_bin * self.subwindow_size
-            i_stop = (i_bin+1) * self.subwindow_size
-            if torch.any(torch.isnan(self.conv[i_bin].weight)) or torch.any(torch.isnan(self.conv[i_bin].bias)):
-                assert False
-            x_new[:, :, i_bin:i_bin+1, :, :] = self.conv[i_bin](
-                x[:, :, i_start:i_stop, :, :]
-            )
+        if torch.any(torch.isnan(self.conv.weight)) or torch.any(torch.isnan(self.conv.bias)):
+            assert False
+        # subwindows as input channels: (N, subwindow_nbins, subwindow_size, H, W)
+        x = x.reshape(x.shape[0], self.subwindow_nbins, self.subwindow_size, x.shape[3], x.shape[4])
+        # (N, num_filters, subwindow_nbins, 1, 1)
+        x_new = self._subwindow_conv(x).squeeze(5).transpose(1, 2)
         x = self._dropout_relu_flatten(x_new)
         return x
 
@@ -291,50 +295,23 @@ class FFTFeatureModel(_FeatureBase):
             8 // self.maxpool_size,
         )
 
-        # list of conv. filter banks (each with self.num_filters) with size self.subwindow_bins
-        self.conv = nn.ModuleList(
-            [
-                nn.Conv3d(
-                    in_channels=1,
-                    out_channels=self.num_filters,
-                    kernel_size=filter_size,
-                ) for _ in range(self.subwindow_nbins)
-            ]
-        )
+        self.conv = self._make_subwindow_conv(filter_size)
 
     def forward(self, x):
         x = x.to(self.args.device)  # needed for PowerPC architecture
         x = self._time_interval_and_maxpool(x)
-        fft_features_size = [
+        # (N, subwindow_nbins, fft_nbins, nfft, H, W); one batched rFFT over all
+        # FFT bins of all subwindows, averaged over the FFT bins
+        x = x.reshape(
             x.shape[0],
             self.subwindow_nbins,
-            self.num_filters,
-            1,
-            1,
-            1,
-        ]
-        fft_features = torch.empty(size=fft_features_size, dtype=x.dtype, device=x.device)
-        for i_sw in torch.arange(self.subwindow_nbins):
-            fft_bins_size = [
-                x.shape[0],
-                self.fft_nbins,
-                self.nfreqs,
-                x.shape[3],
-                x.shape[4],
-            ]
-            fft_bins = torch.empty(size=fft_bins_size, dtype=x.dtype, device=x.device)
-            x_sw = x[:, :, i_sw*self.subwindow_size:(i_sw+1)*self.subwindow_size, :, :]
-            for i_bin in torch.arange(self.fft_nbins):
-                fft_bins[:, i_bin: i_bin + 1, :, :, :] = torch.abs(
-                    torch.fft.rfft(
-                        x_sw[:, :, i_bin * self.nfft:(i_bin+1) * self.nfft, :, :], 
-                        dim=2,
-                    )
-                )
-            fft_sw = torch.mean(fft_bins, dim=1, keepdim=True)
-            fft_sw_features = self.conv[i_sw](fft_sw)
-            fft_features[:, i_sw:i_sw+1, :, :, :, :] = \
-                torch.unsqueeze(fft_sw_features, 1)
+            self.fft_nbins,
+            self.nfft,
+            x.shape[3],
+            x.shape[4],
+        )
+        fft_sw = torch.abs(torch.fft.rfft(x, dim=3)).mean(dim=2)
+        fft_features = self._subwindow_conv(fft_sw)
         output_features = self._dropout_relu_flatten(fft_features)
         return output_features
 
@@ -381,46 +358,34 @@ class DCTFeatureModel(_FeatureBase):
             8 // self.maxpool_size,
         )
 
-        # list of conv. filter banks (each with self.num_filters) with size self.subwindow_bins
-        self.conv = nn.ModuleList(
-            [
-                nn.Conv3d(
-                    in_channels=1,
-                    out_channels=self.num_filters,
-                    kernel_size=filter_size,
-                ) for _ in range(self.subwindow_nbins)
-            ]
-        )
+        self.conv = self._make_subwindow_conv(filter_size)
+
+        # DCT-II bases for the fixed time and spatial sizes; same (unnormalized)
+        # convention as `torch_dct.dct_3d`. Not saved in the state dict.
+        self.register_buffer('dct_time', self._dct_matrix(self.ndct), persistent=False)
+        self.register_buffer('dct_space', self._dct_matrix(8 // self.maxpool_size), persistent=False)
+
+    @staticmethod
+    def _dct_matrix(n: int) -> torch.Tensor:
+        # X[k] = 2 * sum_t x[t] * cos(pi * k * (2t + 1) / (2n))
+        k = np.arange(n)[:, np.newaxis]
+        t = np.arange(n)[np.newaxis, :]
+        return torch.from_numpy(2 * np.cos(np.pi * k * (2 * t + 1) / (2 * n))).float()
 
     def forward(self, x):
         x = x.to(self.args.device)  # needed for PowerPC architecture
         x = self._time_interval_and_maxpool(x)
-        dct_features_size = [
-            x.shape[0],
-            self.subwindow_nbins,
-            self.num_filters,
-            1,
-            1,
-            1,
-        ]
-        dct_features = torch.empty(size=dct_features_size, dtype=x.dtype, device=x.device)
-        for i_sw in torch.arange(self.subwindow_nbins):
-            dct_bins_size = [
-                x.shape[0],
-                self.dct_nbins,
-                self.nfreqs,
-                x.shape[3],
-                x.shape[4],
-            ]
-            dct_bins = torch.empty(size=dct_bins_size, dtype=x.dtype, device=x.device)
-            x_subwindow = x[:, :, i_sw*self.subwindow_size:(i_sw+1)*self.subwindow_size, :, :]
-            for i_bin in torch.arange(self.dct_nbins):
-                dct_bins[:, i_bin: i_bin + 1, :, :, :] = dct.dct_3d(
-                    x_subwindow[:, :, i_bin * self.ndct:(i_bin+1) * self.ndct, :, :]
-                )
-            dct_sw = torch.mean(dct_bins, dim=1, keepdim=True)
-            dct_sw_features = torch.unsqueeze( self.conv[i_sw](dct_sw), 1)
-            dct_features[:, i_sw:i_sw+1, :, :, :, :] = dct_sw_features
+        n_batch, _, _, height, width = x.shape
+        # the DCT and the mean over DCT bins are both linear, so average the
+        # bins of each subwindow first and transform once per subwindow
+        x = x.reshape(n_batch, self.subwindow_nbins, self.dct_nbins, self.ndct, height, width)
+        x = x.mean(dim=2)
+        # separable 3D DCT as three small matrix products (time, then space)
+        dct_time = self.dct_time.to(x.dtype)
+        dct_space = self.dct_space.to(x.dtype)
+        x = torch.einsum('kt,nsthw->nskhw', dct_time, x)
+        dct_sw = dct_space @ x @ dct_space.T
+        dct_features = self._subwindow_conv(dct_sw)
         output_features = self._dropout_relu_flatten(dct_features)
         return output_features
             
@@ -488,54 +453,24 @@ class DWTFeatureModel(_FeatureBase):
             8 // self.maxpool_size,
         )
 
-        # list of conv. filter banks (each with self.num_filters) with size self.subwindow_bins
-        self.conv = nn.ModuleList(
-            [
-                nn.Conv3d(
-                    in_channels=1,
-                    out_channels=self.num_filters,
-                    kernel_size=filter_size,
-                ) for _ in range(self.subwindow_nbins)
-            ]
-        )
+        self.conv = self._make_subwindow_conv(filter_size)
 
     def forward(self, x):
         x = self._time_interval_and_maxpool(x)
-        dwt_features_size = [
-            x.shape[0],
-            self.subwindow_nbins,
-            self.num_filters,
-            1,
-            1,
-            1,
-        ]
-        dwt_features = torch.empty(size=dwt_features_size, dtype=x.dtype, device=x.device)
-        for i_sw in torch.arange(self.subwindow_nbins):
-            x_sw = x[:, :, i_sw*self.subwindow_size:(i_sw+1)*self.subwindow_size, :, :]
-            dwt_sw_size = [
-                x_sw.shape[0],
-                x_sw.shape[1],
-                self.dwt_output_length,
-                x_sw.shape[3],
-                x_sw.shape[4],
-            ]
-            dwt_sw = torch.empty(dwt_sw_size, dtype=x.dtype, device=x.device)
-            for i_batch in torch.arange(x.shape[0]):
-                x_tmp = (
-                    x_sw[i_batch, 0, :, :, :]
-                    .permute(1, 2, 0)
-                )  # make 3D and move time dim. to last
-                x_lo, x_hi = self.dwt(x_tmp)  # multi-level DWT on last dim.
-                coeff = [x_lo] + [hi for hi in x_hi]  # make list of coeff.
-                dwt_sw[i_batch, 0, :, :, :] =  (
-                    torch.cat(coeff, dim=2)
-                    .permute(2, 0, 1)
-                    .unsqueeze(0)
-                    .unsqueeze(0)
-                )  # concat list in dwt coeff. dim, unpermute, and expand
-            dwt_sw_features = self.conv[i_sw](dwt_sw)
-            dwt_features[:, i_sw:i_sw+1, :, :, :, :] = \
-                torch.unsqueeze(dwt_sw_features, 1)
+        n_batch, _, _, height, width = x.shape
+        # (N, 1, T, H, W) -> (N, subwindow_nbins, H, W, subwindow_size) so that
+        # every subwindow of every channel is one row for a single batched DWT
+        x = x.reshape(n_batch, self.subwindow_nbins, self.subwindow_size, height, width)
+        x = x.permute(0, 1, 3, 4, 2).reshape(-1, 1, self.subwindow_size)
+        x_lo, x_hi = self.dwt(x)  # multi-level DWT on last dim.
+        coeff = [x_lo] + [hi for hi in x_hi]  # make list of coeff.
+        # concat list in dwt coeff. dim and restore (N, subwindow_nbins, L, H, W)
+        dwt_sw = (
+            torch.cat(coeff, dim=2)
+            .view(n_batch, self.subwindow_nbins, height, width, self.dwt_output_length)
+            .permute(0, 1, 4, 2, 3)
+        )
+        dwt_features = self._subwindow_conv(dwt_sw)
         output_features = self._dropout_relu_flatten(dwt_features)
         return output_features
 
@@ -47,6 +47,13 @@ class BaseArguments:
             default="output.log",
             help="log file, rel. to `run_dir`",
         )
+        parser.add_argument(
+            "--tty_only_stream_handler",
+            action="store_true",
+            default=False,
+            help="if true, show logs in the console only if stderr is a terminal; "
+            "batch jobs then write each record to `log_file` only.",
+        )
         parser.add_argument(
             "--args_file",
             type=str,
@@ -217,6 +224,24 @@ class BaseArguments:
             default=1,
             help="data parallel distributed training: -1 all GPUs|1 single GPU (default)|N gpus",
         )
+        parser.add_argument(
+            "--compile_model",
+            action="store_true",
+            default=False,
+            help="if true, train with `torch.compile(mode='reduce-overhead')` (requires PyTorch >= 2.0).",
+        )
+        parser.add_argument(
+            "--mixed_precision",
+            action="store_true",
+            default=False,
+            help="if true, use automatic mixed precision (fp16 autocast and grad. scaling) on cuda devices.",
+        )
+        parser.add_argument(
+            "--channels_last",
+            action="store_true",
+            default=False,
+            help="if true, use `channels_last_3d` memory format for the model and 5D input batches.",
+        )
         parser.add_argument(
             "--threshold",
             type=float,
@@ -306,7 +331,7 @@ class BaseArguments:
             "--optimizer",
             type=str,
             default="adam",
-            help="optimizer: `adam` (default) | `sgd`",
+            help="optimizer: `adam` (default) | `adamw` | `sgd`",
         )
         parser.add_argument(
             "--momentum",
@@ -40,10 +40,19 @@ class ELMDataset(torch.utils.data.Dataset):
             phase (str): Dataset creation phase - 'Training', 'Validation' or 'Testing'. Defaults to 'Training'.
         """
         self.args = args
-        self.signals = signals
-        self.labels = labels
+        # store as float32 tensors so that windows are zero-copy views
+        self.signals = torch.from_numpy(np.ascontiguousarray(signals, dtype=np.float32))
+        self.labels = torch.from_numpy(np.ascontiguousarray(labels, dtype=np.float32))
         self.sample_indices = sample_indices
         self.window_start = window_start
+        # label index for each sample and time offsets within a signal window
+        self.label_indices = (
+            sample_indices
+            + self.args.signal_window_size
+            + self.args.label_look_ahead
+            - 1
+        ).astype(np.int64)
+        self.window_offsets = torch.arange(self.args.signal_window_size)
         if logger is not None:
             self.logger = logger
             self.logger.info(f"------>  Creating pytorch dataset")
@@ -54,30 +63,45 @@ class ELMDataset(torch.utils.data.Dataset):
     def __len__(self):
         return len(self.sample_indices)
 
-    def __getitem__(self, idx: int):
+    def __getitem__(self, idx: Union[int, list]):
+        if not np.isscalar(idx):
+            # list of indices from a `BatchSampler`
+            return self._get_batch(idx)
         time_idx = self.sample_indices[idx]
         signal_window = self.signals[
             time_idx : time_idx + self.args.signal_window_size
         ]
-        label = self.labels[
-            time_idx
-            + self.args.signal_window_size
-            + self.args.label_look_ahead
-            - 1
-        ]
+        label = self.labels[self.label_indices[idx]]
         if self.args.data_preproc == "gradient":
-            signal_window = np.transpose(signal_window, axes=(3, 0, 1, 2))
+            signal_window = signal_window.permute(3, 0, 1, 2)
         elif self.args.data_preproc == "rnn":
             signal_window = signal_window.reshape(
                 self.args.signal_window_size, -1
             )
         else:
-            signal_window = signal_window[np.newaxis, ...]
-        signal_window = torch.as_tensor(signal_window, dtype=torch.float32)
-        label = torch.as_tensor(label)
+            signal_window = signal_window.unsqueeze(0)
 
         return signal_window, label
 
+    def _get_batch(self, indices: list):
+        """Gather a batch of signal windows and labels with a single fancy-indexing
+        pass instead of one `__getitem__` call per sample.
+        """
+        time_idx = torch.as_tensor(self.sample_indices[indices], dtype=torch.int64)
+        window_idx = time_idx[:, None] + self.window_offsets
+        signal_windows = self.signals[window_idx]
+        labels = self.labels[torch.from_numpy(self.label_indices[indices])]
+        if self.args.data_preproc == "gradient":
+            signal_windows = signal_windows.permute(0, 4, 1, 2, 3)
+        elif self.args.data_preproc == "rnn":
+            signal_windows = signal_windows.reshape(
+                len(indices), self.args.signal_window_size, -1
+            )
+        else:
+            signal_windows = signal_windows.unsqueeze(1)
+
+        return signal_windows, labels
+
 
 if __name__=="__main__":
     arg_list = [
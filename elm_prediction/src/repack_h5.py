@@ -0,0 +1,65 @@
+"""
+Script to repack an ELM HDF5 data file so that each ELM's `signals` dataset is
+stored as a single chunk compressed with bitshuffle + LZ4. Reading the repacked
+file needs the `hdf5plugin` package, which registers the bitshuffle filter with
+h5py when imported. `BaseData` imports it automatically if it is installed, so
+the repacked file can be passed to `--input_data_file` unchanged.
+
+Usage:
+    python repack_h5.py input.hdf5 output.hdf5
+"""
+import argparse
+from pathlib import Path
+
+import h5py
+
+try:
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+
+def repack(input_file: str, output_file: str) -> None:
+    """Copy all the ELM events from `input_file` to `output_file`, rewriting the
+    `signals` datasets with bitshuffle + LZ4 compression. All other datasets and
+    attributes are copied as-is.
+
+    Args:
+    -----
+        input_file (str): Path to the input HDF5 file.
+        output_file (str): Path to the repacked HDF5 file.
+    """
+    if hdf5plugin is None:
+        raise ImportError("Repacking with bitshuffle + LZ4 requires the `hdf5plugin` package.")
+    assert Path(input_file).resolve() != Path(output_file).resolve()
+    with h5py.File(input_file, "r") as hf_in, h5py.File(output_file, "w") as hf_out:
+        hf_out.attrs.update(hf_in.attrs)
+        elm_keys = list(hf_in)
+        for i_elm, elm_key in enumerate(elm_keys):
+            print(f"ELM {elm_key} ({i_elm + 1} of {len(elm_keys)})")
+            elm_in = hf_in[elm_key]
+            elm_out = hf_out.create_group(elm_key)
+            elm_out.attrs.update(elm_in.attrs)
+            for name, item in elm_in.items():
+                if name != "signals":
+                    hf_in.copy(item, elm_out, name=name)
+                    continue
+                # one chunk per ELM event: every read decompresses exactly once
+                elm_out.create_dataset(
+                    name,
+                    data=item[...],
+                    chunks=item.shape,
+                    **hdf5plugin.Bitshuffle(cname="lz4"),
+                )
+                elm_out[name].attrs.update(item.attrs)
+    input_size = Path(input_file).stat().st_size / 1e6
+    output_size = Path(output_file).stat().st_size / 1e6
+    print(f"Repacked {input_size:.1f} MB -> {output_size:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("input_file", type=str, help="path to the input HDF5 file.")
+    parser.add_argument("output_file", type=str, help="path to the repacked HDF5 file.")
+    args = parser.parse_args()
+    repack(args.input_file, args.output_file)
@@ -17,6 +17,8 @@ class Run:
             use_focal_loss: bool = False,
             use_rnn: bool = False,
             inverse_label_weight: bool = False,
+            mixed_precision: bool = False,
+            channels_last: bool = False,
     ):
         """
         Trainer class containing the boilerplate code for training and evaluation.
@@ -28,6 +30,9 @@ class Run:
             optimizer (torch.optim.Optimizer): Optimizer used during training.
             use_focal_loss (bool): If true, use focal loss. It is supposed to work better in class imbalance problems. See: https://arxiv.org/pdf/1708.02002.pdf
             use_rnn (bool): If true, use a recurrent neural network. It makes sure to take predictions at the last time step.
+            inverse_label_weight (bool): If true, weight the loss element-wise by the inverse label.
+            mixed_precision (bool): If true, run forward passes under fp16 autocast with gradient scaling. Only used on cuda devices.
+            channels_last (bool): If true, send 5D input batches to the device in `channels_last_3d` memory format.
         """
         self.model = model
         self.criterion = criterion
@@ -36,6 +41,13 @@ class Run:
         self.use_focal_loss = use_focal_loss
         self.use_rnn = use_rnn
         self.inverse_label_weight = inverse_label_weight
+        self.mixed_precision = mixed_precision and self.device.type == 'cuda'
+        self.scaler = torch.cuda.amp.GradScaler(enabled=self.mixed_precision)
+        self.memory_format = torch.channels_last_3d if channels_last else torch.preserve_format
+        # `torch.compile` wraps the model; check the class of the original model
+        self.long_labels = (
+            type(getattr(self.model, '_orig_mod', self.model)).__name__ == 'MultiFeaturesClassificationModel'
+        )
 
     def train(
             self,
@@ -46,61 +58,67 @@ class Run:
     ) -> float:
         batch_time = utils.MetricMonitor()
         data_time = utils.MetricMonitor()
-        losses = utils.MetricMonitor()
+        # accumulate the loss on device; read back only when displayed
+        loss_sum = torch.zeros((), device=self.device)
+        n_samples = 0
 
         # put the model to train mode
         self.model.train()
 
+        n_batches = len(data_loader)
+        next_print_idx = print_every - 1
         start = end = time.time()
         for batch_idx, (images, labels) in enumerate(data_loader):
             # data loading time
             data_time.update(time.time() - end)
 
             # zero out all the accumulated gradients
-            self.optimizer.zero_grad()
+            self.optimizer.zero_grad(set_to_none=True)
 
             # send the data to device
-            images = images.to(self.device, dtype=torch.float)
-            labels = labels.to(self.device, dtype=torch.float)
+            images = images.to(
+                self.device,
+                dtype=torch.float,
+                non_blocking=True,
+                memory_format=self.memory_format,
+            )
+            labels = labels.to(self.device, dtype=torch.float, non_blocking=True)
 
             batch_size = images.size(0)
 
-            # forward pass
-            y_preds = self.model(images)
-
-            # use predictions for the last time step for RNN
-            if self.use_rnn:
-                y_preds = y_preds.squeeze()[:, -1]
+            with torch.autocast(device_type=self.device.type, enabled=self.mixed_precision):
+                # forward pass
+                y_preds = self.model(images)
 
-            if type(self.model).__name__ == 'MultiFeaturesClassificationModel':
-                loss = self.criterion(y_preds, labels.type(torch.long))
-            else:
-                loss = self.criterion(y_preds, labels.type_as(y_preds))
+                # use predictions for the last time step for RNN
+                if self.use_rnn:
+                    y_preds = y_preds.squeeze()[:, -1]
 
-            if not torch.all(torch.isfinite(loss)):
-                assert False
+                if self.long_labels:
+                    loss = self.criterion(y_preds, labels.type(torch.long))
+                else:
+                    loss = self.criterion(y_preds, labels)
 
-            if self.use_focal_loss:
-                loss = self._focal_loss(labels, y_preds, loss)
+                if self.use_focal_loss:
+                    loss = self._focal_loss(labels, y_preds, loss)
 
-            if self.inverse_label_weight:
-                loss = torch.div(loss, labels)
+                if self.inverse_label_weight:
+                    loss = torch.div(loss, labels)
 
-            # perform loss reduction
-            loss = loss.mean()
+                # perform loss reduction (criterion may already reduce)
+                if loss.dim() > 0:
+                    loss = loss.mean()
 
             # record loss
-            losses.update(loss.item(), batch_size)
+            loss_sum += loss.detach() * batch_size
+            n_samples += batch_size
 
-            # backpropagate
-            loss.backward()
+            # backpropagate (loss scaling is a no-op without mixed precision)
+            self.scaler.scale(loss).backward()
 
             # optimizer step
-            self.optimizer.step()
-
-            for p in self.model.parameters():
-                if p.requires_grad and not torch.all(torch.isfinite(p)):
-                    assert False
+            self.scaler.step(self.optimizer)
+            self.scaler.update()
 
             # elapsed time
             batch_time.update(time.time() - end)
@@ -111,15 +129,37 @@ class Run:
                 scheduler.step()
 
             # display results
-            if (batch_idx + 1) % print_every == 0:
+            if batch_idx == next_print_idx:
+                next_print_idx += print_every
+                self._check_finite_parameters(epoch, batch_idx)
+                avg_loss = (loss_sum / n_samples).item()
+                if not np.isfinite(avg_loss):
+                    raise RuntimeError(
+                        f"Non-finite average loss {avg_loss} at epoch {epoch + 1}, batch {batch_idx + 1}"
+                    )
                 print(
-                    f"Epoch: [{epoch + 1}][{batch_idx + 1}/{len(data_loader)}] "
+                    f"Epoch: [{epoch + 1}][{batch_idx + 1}/{n_batches}] "
                     f"Batch time: {batch_time.val:.3f} ({batch_time.avg:.3f}) "
-                    f"Elapsed {utils.time_since(start, float(batch_idx + 1) / len(data_loader))} "
-                    f"Loss: {losses.val:.4f} ({losses.avg:.4f}) "
+                    f"Elapsed {utils.time_since(start, float(batch_idx + 1) / n_batches)} "
+                    f"Loss: {loss.item():.4f} ({avg_loss:.4f}) "
                 )
 
-        return losses.avg
+        self._check_finite_parameters(epoch, n_batches - 1)
+        avg_loss = (loss_sum / n_samples).item()
+        if not np.isfinite(avg_loss):
+            raise RuntimeError(
+                f"Non-finite average loss {avg_loss} at the end of epoch {epoch + 1}"
+            )
+
+        return avg_loss
+
+    def _check_finite_parameters(self, epoch: int, batch_idx: int) -> None:
+        # single fused check over all trainable parameters (one host sync)
+        params = [p for p in self.model.parameters() if p.requires_grad]
+        if params and not torch.stack([torch.isfinite(p).all() for p in params]).all():
+            raise RuntimeError(
+                f"Non-finite model parameters after epoch {epoch + 1}, batch {batch_idx + 1}"
+            )
 
     def evaluate(
             self,
@@ -128,12 +168,16 @@ class Run:
     ) -> Tuple[float, np.ndarray, np.ndarray]:
         batch_time = utils.MetricMonitor()
         data_time = utils.MetricMonitor()
-        losses = utils.MetricMonitor()
+        # accumulate the loss on device; read back only when displayed
+        loss_sum = torch.zeros((), device=self.device)
+        n_samples = 0
 
         # switch the model to evaluation mode
         self.model.eval()
         preds = []
         valid_labels = []
+        n_batches = len(data_loader)
+        next_print_idx = print_every - 1
         start = end = time.time()
         images_cwt = None
         for batch_idx, (images, labels) in enumerate(data_loader):
@@ -141,22 +185,28 @@ class Run:
             data_time.update(time.time() - end)
 
             # send the data to device
-            images = images.to(self.device, dtype=torch.float)
-            labels = labels.to(self.device, dtype=torch.float)
+            images = images.to(
+                self.device,
+                dtype=torch.float,
+                non_blocking=True,
+                memory_format=self.memory_format,
+            )
+            labels = labels.to(self.device, dtype=torch.float, non_blocking=True)
 
             batch_size = images.size(0)
 
             # compute loss with no backprop
-            with torch.no_grad():
+            with torch.inference_mode(), torch.autocast(device_type=self.device.type, enabled=self.mixed_precision):
                 y_preds = self.model(images)
+            y_preds = y_preds.float()
 
             if self.use_rnn:
                 y_preds = y_preds.squeeze()[:, -1]
 
-            if type(self.model).__name__ == 'MultiFeaturesClassificationModel':
+            if self.long_labels:
                 loss = self.criterion(y_preds, labels.type(torch.long))
             else:
-                loss = self.criterion(y_preds, labels.type_as(y_preds))
+                loss = self.criterion(y_preds, labels)
 
 
             if self.use_focal_loss:
@@ -165,36 +215,39 @@ class Run:
             if self.inverse_label_weight:
                 loss = torch.div(loss, labels)
 
-            # perform loss reduction
-            loss = loss.mean()
+            # perform loss reduction (criterion may already reduce)
+            if loss.dim() > 0:
+                loss = loss.mean()
 
-            losses.update(loss.item(), batch_size)
+            loss_sum += loss.detach() * batch_size
+            n_samples += batch_size
 
-            # record accuracy
+            # record accuracy; keep on device and transfer once after the loop
             if type(self.criterion).__name__ == 'MSELoss':
-                preds.append(y_preds.cpu().numpy())
+                preds.append(y_preds)
             elif type(self.criterion).__name__ == 'CrossEntropyLoss':
-                preds.append((torch.nn.Softmax(dim=1)(y_preds).cpu().numpy()))
+                preds.append(torch.nn.Softmax(dim=1)(y_preds))
             else:
-                preds.append(y_preds.sigmoid().cpu().numpy())
-            valid_labels.append(labels.cpu().numpy())
+                preds.append(y_preds.sigmoid())
+            valid_labels.append(labels)
 
             # measure elapsed time
             batch_time.update(time.time() - end)
             end = time.time()
 
             # display results
-            if (batch_idx + 1) % print_every == 0:
+            if batch_idx == next_print_idx:
+                next_print_idx += print_every
                 print(
-                    f"Evaluating: [{batch_idx + 1}/{len(data_loader)}] "
+                    f"Evaluating: [{batch_idx + 1}/{n_batches}] "
                     f"Batch time: {batch_time.val:.3f} ({batch_time.avg:.3f}) "
-                    f"Elapsed {utils.time_since(start, float(batch_idx + 1) / len(data_loader))} "
-                    f"Loss: {losses.val:.4f} ({losses.avg:.4f}) "
+                    f"Elapsed {utils.time_since(start, float(batch_idx + 1) / n_batches)} "
+                    f"Loss: {loss.item():.4f} ({(loss_sum / n_samples).item():.4f}) "
                 )
-        predictions = np.concatenate(preds)
-        targets = np.concatenate(valid_labels)
+        predictions = torch.cat(preds).cpu().numpy()
+        targets = torch.cat(valid_labels).cpu().numpy()
 
-        return losses.avg, predictions, targets
+        return (loss_sum / n_samples).item(), predictions, targets
 
     @staticmethod
     def _focal_loss(y_true, y_preds, loss, gamma=2):
@@ -1,61 +1,83 @@
 """Various utility functions used for data preprocessing, training and validation.
+
+PyTorch, torchinfo and the dataset/model modules are imported inside the functions
+that need them so that data preprocessing and logging utilities can be imported
+without the PyTorch import cost.
 """
+from __future__ import annotations
 
 import re
-import os
+import atexit
+import queue
 import shutil
 import subprocess
 import pickle
 import sys
 import logging
+import logging.handlers
 import time
-import math
 import argparse
 import importlib
-from typing import Union, Tuple, Sequence, Callable
+import importlib.util
+import functools
+from typing import Union, Tuple, Sequence, Callable, TYPE_CHECKING
 from pathlib import Path
 from collections import OrderedDict
 from traceback import print_tb
 
 import numpy as np
-import torch
-from torchinfo import summary
 
 try:
     from .. import package_dir
-    from . import utils, dataset
-    from ..models import multi_features_ds_v2_model
 except ImportError:
     from elm_prediction import package_dir
-    from elm_prediction.src import utils, dataset
-    from elm_prediction.models import multi_features_ds_v2_model
+
+if TYPE_CHECKING:
+    import torch
+    from elm_prediction.src import dataset
+
+# log record formatters shared by all the file and console handlers
+_FILE_FORMATTER = logging.Formatter("%(asctime)s:%(name)s: %(levelname)s:%(message)s")
+_STREAM_FORMATTER = logging.Formatter("%(name)s: %(levelname)s:%(message)s")
 
 
 class MetricMonitor:
     """Calculates and stores the average value of the metrics/loss"""
 
-    def __init__(self):
+    def __init__(self, ema: Union[float, None] = None):
+        """
+        Args:
+        -----
+            ema (float, optional): If given, `avg` is an exponential moving
+                average with this decay factor (e.g. 0.98) which tracks the
+                recent values instead of the average over all updates.
+                Defaults to None.
+        """
+        self.ema = ema
         self.reset()
 
     def reset(self):
         """Reset all the parameters to zero."""
         self.val = 0
         self.avg = 0
-        self.sum = 0
         self.count = 0
 
     def update(self, val, n: int = 1):
-        """Update the value of the metrics and calculate their
-        average value over the whole dataset.
+        """Update the value of the metrics and their running average value
+        over the whole dataset. The running mean stays in the magnitude range
+        of the metric instead of accumulating an ever growing sum.
         Args:
         -----
             val (float): Computed metric (per batch)
             n (int, optional): Batch size. Defaults to 1.
         """
-        self.val = val
-        self.sum += val * n
+        self.val = val = float(val)
+        if self.ema is not None and self.count:
+            self.avg = self.ema * self.avg + (1 - self.ema) * val
+            self.count += n
+            return
         self.count += n
-        self.avg = self.sum / self.count
+        self.avg += (val - self.avg) * n / self.count
 
 
 class logParse:
@@ -98,17 +120,15 @@ class logParse:
             log_path.parent.mkdir(parents=True, exist_ok=True)  # make dir. for log file
             # create handlers
             f_handler = logging.FileHandler(log_path.as_posix(), mode="w")
-            # create formatters and add it to the handlers
-            f_format = logging.Formatter("%(asctime)s:%(name)s: %(levelname)s:%(message)s")
-            f_handler.setFormatter(f_format)
+            # add formatter to the handlers
+            f_handler.setFormatter(_FILE_FORMATTER)
             # add handlers to the logger
             logger.addHandler(f_handler)
 
         # display the logs in console
         if self.stream_handler:
             s_handler = logging.StreamHandler()
-            s_format = logging.Formatter("%(name)s: %(levelname)s:%(message)s")
-            s_handler.setFormatter(s_format)
+            s_handler.setFormatter(_STREAM_FORMATTER)
             logger.addHandler(s_handler)
 
         self.logger = logger
@@ -150,6 +170,11 @@ def get_test_dataset(args: argparse.Namespace, file_name: str, logger: logging.g
         transforms: Image transforms to perform data augmentation on the given
             input. Defaults to None.
     """
+    try:
+        from . import dataset
+    except ImportError:
+        from elm_prediction.src import dataset
+
     with open(file_name, "rb") as f:
         test_data = pickle.load(f)
 
@@ -162,11 +187,27 @@ def get_test_dataset(args: argparse.Namespace, file_name: str, logger: logging.g
 
     return data_attrs, test_dataset
 
+def _close_logger_handlers(logger: logging.Logger) -> None:
+    """Stop the queue listener and close the handlers that `get_logger` attached
+    to `logger` in a previous call."""
+    listener = getattr(logger, "_queue_listener", None)
+    if listener is not None:
+        listener.stop()
+        atexit.unregister(listener.stop)
+        for handler in listener.handlers:
+            handler.close()
+        logger._queue_listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
 # log the model and data preprocessing outputs
 def get_logger(
     script_name: Union[str, None] = None,
     log_file: Union[str, Path, None] = 'output.log',
     stream_handler: bool = True,
+    tty_only_stream_handler: bool = False,
 ) -> logging.getLogger:
     """Initiate the logger to log the progress into a file.
 
@@ -175,6 +216,9 @@ def get_logger(
         script_name (str): Name of the scripts outputting the logs.
         log_file (str): Name of the log file.
         stream_handler (bool, optional): If true, show logs in the console. Defaults to True.
+        tty_only_stream_handler (bool, optional): If true and logging to a file,
+            skip the console handler when stderr is not a terminal (e.g. batch
+            jobs) since the file has all records. Defaults to False.
 
     Returns:
     --------
@@ -182,24 +226,40 @@ def get_logger(
     """
     logger = logging.getLogger(name=script_name)
     logger.setLevel(logging.INFO)
+    # repeated calls (e.g. several training runs in one process) replace the
+    # previous handlers instead of emitting every record more than once
+    _close_logger_handlers(logger)
+    handlers = []
 
     if log_file is not None:
         log_file = Path(log_file)
         log_file.parent.mkdir(parents=True, exist_ok=True)  # make dir. for log file
         # create handlers
         f_handler = logging.FileHandler(log_file.as_posix(), mode="a")
-        # create formatters and add it to the handlers
-        f_format = logging.Formatter("%(asctime)s:%(name)s: %(levelname)s:%(message)s")
-        f_handler.setFormatter(f_format)
-        # add handlers to the logger
-        logger.addHandler(f_handler)
+        # add formatter to the handlers
+        f_handler.setFormatter(_FILE_FORMATTER)
+        handlers.append(f_handler)
 
     # display the logs in console
-    if stream_handler:
+    if stream_handler and not (
+        tty_only_stream_handler and log_file is not None and not sys.stderr.isatty()
+    ):
         s_handler = logging.StreamHandler()
-        s_format = logging.Formatter("%(name)s: %(levelname)s:%(message)s")
-        s_handler.setFormatter(s_format)
-        logger.addHandler(s_handler)
+        s_handler.setFormatter(_STREAM_FORMATTER)
+        handlers.append(s_handler)
+
+    # the logger only enqueues records; a listener thread passes them on to
+    # the file and console handlers so that logging calls don't block on I/O
+    if handlers:
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        listener.start()
+        # drain the queue at interpreter exit
+        atexit.register(listener.stop)
+        logger._queue_listener = listener
 
     return logger
 
@@ -209,9 +269,7 @@ def get_logger(
 def time_since(since: int, percent: float) -> str:
     """Helper function to time the training and evaluation process"""
     def as_minutes_seconds(s: float) -> str:
-        m = math.floor(s / 60)
-        s -= m * 60
-        m, s = int(m), int(s)
+        m, s = divmod(int(s), 60)
         return f"{m:2d}m {s:2d}s"
     now = time.time()
     elapsed = now - since
@@ -220,29 +278,62 @@ def time_since(since: int, percent: float) -> str:
     return f"{as_minutes_seconds(elapsed)} (remain {as_minutes_seconds(remaining)})"
 
 
+@functools.lru_cache(maxsize=None)
+def _lowercase_namespace(module) -> dict:
+    """Map lowercase attribute names of `module` to the attributes."""
+    return {name.lower(): obj for name, obj in vars(module).items()}
+
+
+def _get_class(module, name: str) -> Union[Callable, None]:
+    """Get the class for `name` (e.g. `cnn_v2_model`) from `module`, matching
+    the class name case-insensitively and without underscores. The CamelCase
+    name is tried first; acronym class names like `CNNV2Model` fall back to
+    a lowercase lookup."""
+    camel_name = "".join(part.capitalize() for part in name.split("_"))
+    cls = getattr(module, camel_name, None)
+    if cls is None:
+        cls = _lowercase_namespace(module).get(camel_name.lower())
+    return cls
+
+
+@functools.lru_cache(maxsize=None)
+def _import_class_module(module_path: str, package: str, arg_name: str, value: str):
+    """Import the module for the `--data_preproc`/`--model_name` command line
+    argument, raising a `ValueError` naming the argument if it does not exist.
+    The lookup is cached per resolved package and module path."""
+    if importlib.util.find_spec(module_path, package=package) is None:
+        raise ValueError(
+            f"Unknown `{arg_name}` value `{value}`: module `{module_path}` not found"
+        )
+    return importlib.import_module(module_path, package=package)
+
+
 def create_data_class(data_name: str) -> Callable:
     """
     Helper function to import the data preprocessing module as per the command
-    line argument `--data_preproc`.
+    line argument `--data_preproc`. The module import is cached for repeated calls.
 
     Args:
         data_name (str): `--data_preproc` argument.
 
     Returns:
         Object of the data class.
+
+    Raises:
+        ValueError: If there is no data module or class for `data_name`.
     """
     parent_package = Path(sys.argv[0]).parent.stem + '.src'
     data_filename = data_name + "_data"
     data_class_path = "..data_preprocessing." + data_filename
-    data_lib = importlib.import_module(
+    data_lib = _import_class_module(
         data_class_path,
         package=parent_package,
+        arg_name="--data_preproc",
+        value=data_name,
     )
-    data_class = None
-    _data_name = data_name.replace("_", "") + "data"
-    for name, cls in data_lib.__dict__.items():
-        if name.lower() == _data_name.lower():
-            data_class = cls
+    data_class = _get_class(data_lib, data_filename)
+    if data_class is None:
+        raise ValueError(f"No data class for `--data_preproc {data_name}` in `{data_lib.__name__}`")
 
     return data_class
 
@@ -320,10 +411,13 @@ def model_details(model: torch.nn.Module, x: torch.Tensor, input_size: tuple) ->
     Returns:
         None
     """
+    from torchinfo import summary
+
     print("\t\t\t\tMODEL SUMMARY")
-    summary(model, input_size=input_size)
+    # the summary already runs a forward pass; its first entry is the model itself
+    model_stats = summary(model, input_size=input_size)
     print(f'Batched input size: {x.shape}')
-    print(f"Batched output size: {model(x).shape}")
+    print(f"Batched output size: {model_stats.summary_list[0].output_size}")
     print(f"Model contains {get_params(model)} trainable parameters!")
 
 
@@ -362,41 +456,50 @@ def create_model_class(
     ) -> torch.nn.Module:
     """
     Helper function to import the module for the model being used as per the
-    command line argument `--model_name`.
+    command line argument `--model_name`. The module import is cached for repeated calls.
 
     Args:
         model_name (str): `--model_name` argument.
 
     Returns:
         Object of the model class.
+
+    Raises:
+        ValueError: If there is no model module or class for `model_name`.
     """
     model_type = Path(sys.argv[0]).parent.stem
     model_filename = model_name + "_model"
     model_path = "..models." + model_filename
-    model_lib = importlib.import_module(
+    model_lib = _import_class_module(
         model_path,
         package=model_type + '.src',
+        arg_name="--model_name",
+        value=model_name,
     )
-    model = None
-    _model_name = model_name.replace("_", "") + "model"
-    for name, cls in model_lib.__dict__.items():
-        if name.lower() == _model_name.lower():
-            model = cls
-            model.model_type = model_type  # assigning a type to a model makes it easier to share scripts between them.
+    model = _get_class(model_lib, model_filename)
+    if model is None:
+        raise ValueError(f"No model class for `--model_name {model_name}` in `{model_lib.__name__}`")
+    model.model_type = model_type  # assigning a type to a model makes it easier to share scripts between them.
 
     return model
 
 def get_model(args: argparse.Namespace,
               logger: logging.Logger):
-    _, model_cpt_path = utils.create_output_paths(args)
+    import torch
+    try:
+        from ..models import multi_features_ds_v2_model
+    except ImportError:
+        from elm_prediction.models import multi_features_ds_v2_model
+
+    _, model_cpt_path = create_output_paths(args)
     gen_type_suffix = '_' + re.split('[_.]', args.input_file)[-2] if args.generated else ''
     model_name = args.model_name + gen_type_suffix
     accepted_preproc = ['wavelet', 'unprocessed']
 
-    model_cpt_file = os.path.join(model_cpt_path, f'{args.model_name}_lookahead_{args.label_look_ahead}'
-                                                  f'{gen_type_suffix}'
-                                                  f'{"_" + args.data_preproc if args.data_preproc in accepted_preproc else ""}'
-                                                  f'{"_" + args.balance_data if args.balance_data else ""}.pth')
+    model_cpt_file = Path(model_cpt_path) / (f'{args.model_name}_lookahead_{args.label_look_ahead}'
+                                             f'{gen_type_suffix}'
+                                             f'{"_" + args.data_preproc if args.data_preproc in accepted_preproc else ""}'
+                                             f'{"_" + args.balance_data if args.balance_data else ""}.pth')
 
     raw_model = (multi_features_ds_v2_model.RawFeatureModel(args) if args.raw_num_filters > 0 else None)
     fft_model = (multi_features_ds_v2_model.FFTFeatureModel(args) if args.fft_num_filters > 0 else None)
@@ -404,7 +507,7 @@ def get_model(args: argparse.Namespace,
     features = [type(f).__name__ for f in [raw_model, fft_model, cwt_model] if f]
 
     logger.info(f'Found {model_name} state dict at {model_cpt_file}.')
-    model_cls = utils.create_model(args.model_name)
+    model_cls = create_model_class(args.model_name)
     if 'MULTI' in args.model_name.upper():
         model = model_cls(args, raw_model, fft_model, cwt_model)
     else:
@@ -85,7 +85,11 @@ def train_loop(
     test_data_file, checkpoint_file = utils.create_output_paths(args)
 
     # create LOGGER
-    LOGGER = utils.get_logger(script_name=__name__, log_file=log_file)
+    LOGGER = utils.get_logger(
+        script_name=__name__,
+        log_file=log_file,
+        tty_only_stream_handler=args.tty_only_stream_handler,
+    )
     LOGGER.info(args_obj.make_args_summary_string())
 
     LOGGER.info(f"  Output directory: {output_dir.resolve().as_posix()}")
@@ -105,6 +109,11 @@ def train_loop(
         LOGGER.info(f'  Distributed data parallel: process rank {_rank} on GPU {args.device}')
     device = torch.device(args.device)
     LOGGER.info(f'------>  Target device: {device}')
+    if device.type == 'cuda':
+        # input shape is fixed (drop_last=True), so cache the fastest conv algorithms
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
 
     # create train, valid and test data
     data_cls = utils.create_data_class(args.data_preproc)
@@ -124,6 +133,9 @@ def train_loop(
                     "elm_indices": test_data[4],
                 },
                 f,
+                # protocol 5 pickles the array buffers in-band without an
+                # intermediate bytes copy, halving peak memory on load
+                protocol=pickle.HIGHEST_PROTOCOL,
             )
         LOGGER.info(f"  File size: {test_data_file.stat().st_size/1e6:.1f} MB")
 
@@ -131,29 +143,45 @@ def train_loop(
     train_dataset = dataset.ELMDataset(args, *train_data[0:4], logger=LOGGER)
     valid_dataset = dataset.ELMDataset(args, *valid_data[0:4], logger=LOGGER)
 
-    # training and validation dataloaders
+    # keep loader worker processes alive across epochs
+    worker_kwargs = {}
+    if args.num_workers > 0:
+        worker_kwargs = dict(persistent_workers=True, prefetch_factor=2)
+
+    # training and validation dataloaders; the datasets fetch whole batches
+    # of sample indices from `BatchSampler`
     train_loader = torch.utils.data.DataLoader(
         train_dataset,
-        batch_size=args.batch_size,
-        shuffle=True,
+        batch_size=None,  # must be disabled when using samplers
+        sampler=torch.utils.data.BatchSampler(
+            torch.utils.data.RandomSampler(train_dataset),
+            batch_size=args.batch_size,
+            drop_last=True,
+        ),
         num_workers=args.num_workers,
         pin_memory=True,
-        drop_last=True,
+        **worker_kwargs,
     )
 
     valid_loader = torch.utils.data.DataLoader(
         valid_dataset,
-        batch_size=args.batch_size,
-        shuffle=False,
+        batch_size=None,  # must be disabled when using samplers
+        sampler=torch.utils.data.BatchSampler(
+            torch.utils.data.SequentialSampler(valid_dataset),
+            batch_size=args.batch_size,
+            drop_last=True,
+        ),
         num_workers=args.num_workers,
         pin_memory=True,
-        drop_last=True,
+        **worker_kwargs,
     )
 
     # model class and model instance
     model_class = utils.create_model_class(args.model_name)
     model = model_class(args)
     model = model.to(device)
+    if args.channels_last:
+        model = model.to(memory_format=torch.channels_last_3d)
 
     # distribute model for data-parallel training
     if _rank is not None:
@@ -191,6 +219,12 @@ def train_loop(
             lr=args.lr, 
             weight_decay=args.weight_decay,
         )
+    elif args.optimizer.lower() == 'adamw':
+        optimizer = torch.optim.AdamW(
+            model.parameters(), 
+            lr=args.lr, 
+            weight_decay=args.weight_decay,
+        )
     elif args.optimizer.lower() == 'sgd':
         optimizer = torch.optim.SGD(
             model.parameters(), 
@@ -211,35 +245,48 @@ def train_loop(
         verbose=True,
     )
 
-    # loss function
+    # loss function; element-wise loss is only needed for focal loss or label weighting
+    reduction = "none" if args.focal_loss or args.inverse_label_weight else "mean"
     if args.regression:
-        criterion = torch.nn.MSELoss(reduction="none")
+        criterion = torch.nn.MSELoss(reduction=reduction)
     else:
-        criterion = torch.nn.BCEWithLogitsLoss(reduction="none")
+        criterion = torch.nn.BCEWithLogitsLoss(reduction=reduction)
 
     # define variables for ROC and loss
     best_score = -np.inf
 
+    # compiled model for the training engine; `model` stays eager for
+    # checkpoints and ONNX export
+    train_model = model
+    if args.compile_model:
+        if hasattr(torch, 'compile'):
+            LOGGER.info("  Compiling model with `torch.compile`")
+            train_model = torch.compile(model, mode="reduce-overhead")
+        else:
+            LOGGER.info("  `torch.compile` requires PyTorch >= 2.0; training in eager mode")
+
     # instantiate training object
     use_rnn = True if args.data_preproc == "rnn" else False
     engine = trainer.Run(
-        model,
+        train_model,
         device=device,
         criterion=criterion,
         optimizer=optimizer,
         use_focal_loss=args.focal_loss,
         use_rnn=use_rnn,
         inverse_label_weight=args.inverse_label_weight,
+        mixed_precision=args.mixed_precision,
+        channels_last=args.channels_last,
     )
 
     # containers to hold train and validation losses
-    train_loss = np.empty(0)
-    valid_loss = np.empty(0)
-    scores = np.empty(0)
+    train_loss = np.zeros(args.n_epochs)
+    valid_loss = np.zeros(args.n_epochs)
+    scores = np.zeros(args.n_epochs)
     if args.regression:
         pass
     else:
-        roc_scores = np.empty(0)
+        roc_scores = np.zeros(args.n_epochs)
 
     outputs = {}
 
@@ -257,7 +304,7 @@ def train_loop(
         )
         if args.regression:
             avg_loss = np.sqrt(avg_loss)
-        train_loss = np.append(train_loss, avg_loss)
+        train_loss[epoch] = avg_loss
 
         # evaluate validation data
         avg_val_loss, preds, valid_labels = engine.evaluate(
@@ -266,7 +313,7 @@ def train_loop(
         )
         if args.regression:
             avg_val_loss = np.sqrt(avg_val_loss)
-        valid_loss = np.append(valid_loss, avg_val_loss)
+        valid_loss[epoch] = avg_val_loss
 
         # step the learning rate scheduler
         scheduler.step(avg_val_loss)
@@ -274,16 +321,16 @@ def train_loop(
         if args.regression:
             # R2 score
             score = r2_score(valid_labels, preds)
-            scores = np.append(scores, score)
+            scores[epoch] = score
             score_type = 'R2'
         else:
             # F1 scoring
             score = f1_score(valid_labels, (preds > args.threshold).astype(int))
-            scores = np.append(scores, score)
+            scores[epoch] = score
             score_type = 'F1'
             # ROC scoring
             roc_score = roc_auc_score(valid_labels, preds)
-            roc_scores = np.append(roc_scores, roc_score)
+            roc_scores[epoch] = roc_score
 
         elapsed = time.time() - start_time
 
@@ -292,16 +339,16 @@ def train_loop(
             f"\tscore: {score:.3f} \ttime elapsed: {elapsed:.1f} s"
         )
 
-        # update and save outputs
-        outputs['train_loss'] = train_loss
-        outputs['valid_loss'] = valid_loss
-        outputs['scores'] = scores
+        # update and save outputs (only completed epochs)
+        outputs['train_loss'] = train_loss[:epoch+1]
+        outputs['valid_loss'] = valid_loss[:epoch+1]
+        outputs['scores'] = scores[:epoch+1]
         outputs['score_type'] = score_type # A helper to keep track of which score is being used. Useful in plotting.
 
         if args.regression:
             pass
         else:
-            outputs['roc_scores'] = roc_scores
+            outputs['roc_scores'] = roc_scores[:epoch+1]
 
         with open(output_file.as_posix(), "w+b") as f:
             pickle.dump(outputs, f)
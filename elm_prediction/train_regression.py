@@ -88,7 +88,11 @@ def train_loop(input_args: Union[list, dict, None] = None,
     args_file = output_dir / (Path(args.args_file).stem + file_suffix + Path(args.args_file).suffix)
     test_data_file, checkpoint_file = utils.create_output_paths(args)
 
-    LOGGER = utils.get_logger(script_name=__name__, log_file=log_file)
+    LOGGER = utils.get_logger(
+        script_name=__name__,
+        log_file=log_file,
+        tty_only_stream_handler=getattr(args, "tty_only_stream_handler", False),
+    )
 
     if args.device == 'auto':
         args.device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -111,7 +115,8 @@ def train_loop(input_args: Union[list, dict, None] = None,
         LOGGER.info(f"  Test data will be saved to: {test_data_file}")
         with open(test_data_file, "wb") as f:
             pickle.dump({"signals": test_data[0], "labels": test_data[1], "sample_indices": test_data[2],
-                    "window_start": test_data[3], "elm_indices": test_data[4], }, f, )
+                    "window_start": test_data[3], "elm_indices": test_data[4], }, f,
+                        protocol=pickle.HIGHEST_PROTOCOL, )
 
     # create datasets
     train_dataset = dataset.ELMDataset(args, *train_data[0:4], logger=LOGGER)
@@ -1,9 +1,13 @@
 import sys
 import pytest
 import shutil
+from pathlib import Path
 
 from elm_prediction.train import train_loop
 from elm_prediction.analyze import Analysis
+from elm_prediction.options.train_arguments import TrainArguments
+from elm_prediction.data_preprocessing.regression_data import RegressionData
+from elm_prediction.src import utils
 
 
 RUN_DIR = 'run_dir'
@@ -132,6 +136,26 @@ def test_multifeatures_v2_regression_with_log():
     input_args['regression'] = 'log'
     train_loop(input_args)
 
+def test_regression_data_preprocessing():
+    output_dir = Path(RUN_DIR) / 'regression_data'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    input_args = [f"--{key}={value}" for key, value in DEFAULT_INPUT_ARGS.items()]
+    input_args.extend([
+        '--output_dir', output_dir.as_posix(),
+        '--regression',
+        '--data_preproc', 'regression',
+        '--label_look_ahead', '0',
+        '--truncate_buffer', '0',
+    ])
+    args = TrainArguments().parse(arg_list=input_args)
+    logger = utils.get_logger(script_name=__name__, log_file=None)
+    data_obj = RegressionData(args, logger)
+    for signals, labels, sample_indices, window_start, _ in data_obj.get_data():
+        # signals are cut to the pre-ELM period together with the labels
+        assert signals.shape[0] == labels.shape[0]
+        assert sample_indices.max() + args.signal_window_size - 1 < labels.size
+        assert window_start.max() < labels.size
+
 def test_multifeatures_v2_cnn():
     input_args = DEFAULT_INPUT_ARGS.copy()
     input_args['model_name'] = 'multi_features_ds_v2'
@@ -0,0 +1,31 @@
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# `lstm_autoencoder` imports `options` and `src` as top-level packages
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, (REPO_DIR / 'elm_prediction').as_posix())
+sys.path.insert(0, (REPO_DIR / 'auto_labeling').as_posix())
+import lstm_autoencoder
+
+
+def test_lstm_ae_batched_reconstruction_errors():
+    torch.manual_seed(0)
+    args = argparse.Namespace(
+        model_name='lstm_ae',
+        signal_window_size=16,
+        hidden_size=8,
+    )
+    model = lstm_autoencoder.build_model(args)
+    dataset = torch.utils.data.TensorDataset(torch.randn(10, 16, 64))
+    mae = {}
+    for batch_size in [1, 4]:
+        data_loader = torch.utils.data.DataLoader(dataset, batch_size=batch_size)
+        mae[batch_size] = lstm_autoencoder.reconstruction_errors(
+            model, data_loader, len(dataset), 'cpu'
+        )
+    # per-sequence error must not depend on the other sequences in the batch
+    np.testing.assert_allclose(mae[4], mae[1], rtol=1e-5)
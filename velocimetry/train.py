@@ -64,7 +64,11 @@ def train_loop(input_args: dict,
     test_data_file, checkpoint_file = utils.create_output_paths(args)
 
     # create LOGGER
-    LOGGER = utils.get_logger(script_name=__name__, log_file=log_file)
+    LOGGER = utils.get_logger(
+        script_name=__name__,
+        log_file=log_file,
+        tty_only_stream_handler=args.tty_only_stream_handler,
+    )
     LOGGER.info(args_obj.make_args_summary_string())
 
     LOGGER.info(f"  Output directory: {output_dir.resolve().as_posix()}")